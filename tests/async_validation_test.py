@@ -0,0 +1,255 @@
+from __future__ import annotations
+import asyncio
+from itertools import islice
+import threading
+from typing import AsyncIterator
+import pytest
+from pytest import mark
+
+from byte_validation_test import validate_bytes
+from dialect_test import Dialect
+from schema_test import CsvSchema
+from validation_result_test import ValidationResult
+
+fsspec = pytest.importorskip("fsspec")
+
+__all__ = ["fetch_range", "iter_validate_ranges", "validate_ranges_async", "open_async_fs"]
+
+
+def open_async_fs(url: str, **storage_options):
+    """
+    Get the fsspec filesystem and path for ``url``, instantiating an async filesystem
+    (such as HTTP or S3) in asynchronous mode so its coroutines may be awaited directly.
+    """
+    protocol, _ = fsspec.core.split_protocol(url)
+    if fsspec.get_filesystem_class(protocol or "file").async_impl:
+        storage_options = {**storage_options, "asynchronous": True}
+    return fsspec.core.url_to_fs(url, **storage_options)
+
+
+async def fetch_range(fs, path: str, start: int, end: int) -> bytes:
+    """
+    Read the bytes ``[start, end)`` of the file at ``path``, awaiting the ranged request
+    of an async filesystem or else running the blocking read in a worker thread.
+    """
+    if getattr(fs, "async_impl", False):
+        return await fs._cat_file(path, start=start, end=end)
+    return await asyncio.to_thread(fs.cat_file, path, start=start, end=end)
+
+
+async def iter_validate_ranges(
+    url: str,
+    store: dict[int, list],
+    n_cols: int | None = None,
+    dialect: Dialect = Dialect(),
+    encoding="utf-8",
+    max_concurrency: int = 8,
+    fs=None,
+    schema: CsvSchema | None = None,
+    **storage_options,
+) -> AsyncIterator[tuple[int, ValidationResult]]:
+    """
+    Validate every partition in the ``store`` of the file at ``url`` (on any fsspec
+    filesystem) with :func:`validate_bytes`, issuing the ranged reads concurrently and
+    validating each range in a worker thread as soon as its bytes arrive (so that a large
+    range does not stall the event loop and the other reads in flight). The task of a
+    range is only created once one of the at most ``max_concurrency`` in flight has been
+    validated and its result taken by the consumer, so at most that many ranges are
+    requested or held in memory at once, and a slow consumer holds back the reads.
+
+    Args:
+      store  : The partitions, as ``{offset: ["{{u}}", start, length]}`` where the
+               ``"{{u}}"`` template refers to ``url`` (or else is another URL on the same
+               filesystem).
+      fs     : The filesystem to read from (default: that of ``url``, instantiated with
+               ``storage_options``)
+      schema : A :class:`CsvSchema` giving the number of columns and the dialect (in
+               place of ``n_cols`` and ``dialect``)
+
+    Yields:
+      The offset and :class:`ValidationResult` of each partition (with the ``error_pos``
+      of an invalid partition given as an offset in the file), in order of completion.
+    """
+    if fs is None:
+        fs, path = open_async_fs(url, **storage_options)
+    else:
+        path = fsspec.core.strip_protocol(url)
+    if schema is not None:
+        n_cols, dialect = schema.n_cols, schema.dialect
+    byte_kwargs = dialect.byte_kwargs(encoding)
+
+    async def validate_range(offset, part_url, start, length):
+        part_path = path if part_url == "{{u}}" else fsspec.core.strip_protocol(part_url)
+        data = await fetch_range(fs, part_path, start, start + length)
+        # Validated in a worker thread, so the event loop keeps serving the other reads
+        result = await asyncio.to_thread(validate_bytes, data, n_cols, **byte_kwargs)
+        if result.error_pos is not None:
+            result.error_pos += start  # The offset in the file, not the range
+        return offset, result
+
+    parts = iter(store.items())
+    pending = set()
+    try:
+        while True:
+            for offset, (part_url, start, length) in islice(parts, max_concurrency - len(pending)):
+                pending.add(asyncio.create_task(validate_range(offset, part_url, start, length)))
+            if not pending:
+                return
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def validate_ranges_async(
+    url: str,
+    store: dict[int, list],
+    n_cols: int | None = None,
+    dialect: Dialect = Dialect(),
+    encoding="utf-8",
+    max_concurrency: int = 8,
+    fs=None,
+    schema: CsvSchema | None = None,
+    **storage_options,
+) -> dict[int, ValidationResult]:
+    """
+    Validate every partition in the ``store`` concurrently (see
+    :func:`iter_validate_ranges`), returning a :class:`ValidationResult` per partition
+    offset in the order of the ``store``.
+    """
+    results = {}
+    async for offset, result in iter_validate_ranges(
+        url, store, n_cols, dialect, encoding, max_concurrency, fs, schema, **storage_options
+    ):
+        results[offset] = result
+    return {offset: results[offset] for offset in store}
+
+
+### Tests begin here
+
+multiline_dummy_bytes = b'it\ts\nme\tlo\nuis\t:)\nhel\t"lo\nwor\tld"\naga\tin...!\n'
+tsv_dialect = Dialect(delimiter="\t")
+
+
+class SlowMemoryFileSystem:
+    """
+    An async stand-in for a remote filesystem, serving ranges of in-memory files after
+    a delay and recording the number of requests and the most ever in flight at once.
+    """
+
+    async_impl = True
+
+    def __init__(self, files: dict[str, bytes], latency: float = 0.01):
+        self.files = files
+        self.latency = latency
+        self.n_requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _cat_file(self, path, start=None, end=None):
+        self.n_requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.latency)
+        self.in_flight -= 1
+        return self.files[path][start:end]
+
+
+@mark.parametrize(
+    "store,expected",
+    [
+        (
+            {0: ["{{u}}", 0, 11], 11: ["{{u}}", 11, 23], 34: ["{{u}}", 34, 11]},
+            {0: ValidationResult(2, 11), 11: ValidationResult(2, 23), 34: ValidationResult(1, 11)},
+        ),
+        (
+            {0: ["{{u}}", 0, 26], 26: ["{{u}}", 26, 19]},
+            {
+                0: ValidationResult(3, 18, 18, "open_quote"),
+                26: ValidationResult(0, 0, 26, "quotechar"),
+            },
+        ),
+    ],
+)
+def test_validate_memory_ranges(store, expected):
+    """
+    Show that the partitions of a file on the in-memory filesystem are read and
+    validated by offset, with the split at the non-row-terminating offset 26 invalid.
+    """
+    fs = fsspec.filesystem("memory")
+    fs.pipe("/my_dummy_file.tsv", multiline_dummy_bytes)
+    url = "memory://my_dummy_file.tsv"
+    results = asyncio.run(validate_ranges_async(url, store, 2, tsv_dialect))
+    assert results == expected
+
+
+def test_validate_local_ranges(tmp_path):
+    """
+    Show that a local file (read in worker threads, as its filesystem is not async) is
+    validated the same way, here with the number of columns and dialect of a schema.
+    """
+    file_path = tmp_path / "my_dummy_file.tsv"
+    file_path.write_bytes(multiline_dummy_bytes)
+    store = {0: ["{{u}}", 0, 34], 34: ["{{u}}", 34, 11]}
+    schema = CsvSchema.from_head(multiline_dummy_bytes, tsv_dialect)
+    results = asyncio.run(validate_ranges_async(f"file://{file_path}", store, schema=schema))
+    assert results == {0: ValidationResult(4, 34), 34: ValidationResult(1, 11)}
+
+
+def test_validate_off_event_loop(monkeypatch):
+    """
+    Show that the ranges are validated in worker threads, so the event loop is not held
+    up by the validation of a large range.
+    """
+    loop_thread = threading.get_ident()
+    validated_threads = []
+    unrecorded_validate_bytes = validate_bytes
+
+    def recording_validate_bytes(*args, **kwargs):
+        validated_threads.append(threading.get_ident())
+        return unrecorded_validate_bytes(*args, **kwargs)
+
+    monkeypatch.setitem(globals(), "validate_bytes", recording_validate_bytes)
+    fs = SlowMemoryFileSystem({"/my_dummy_file.tsv": multiline_dummy_bytes})
+    store = {0: ["{{u}}", 0, 34], 34: ["{{u}}", 34, 11]}
+    url = "memory://my_dummy_file.tsv"
+    results = asyncio.run(validate_ranges_async(url, store, 2, tsv_dialect, fs=fs))
+    assert results == {0: ValidationResult(4, 34), 34: ValidationResult(1, 11)}
+    assert len(validated_threads) == 2 and loop_thread not in validated_threads
+
+
+@mark.parametrize("max_concurrency", [1, 3])
+def test_bounded_concurrency(max_concurrency):
+    """
+    Show that no more than ``max_concurrency`` ranges are ever requested at once, while
+    that many are (so the latency of each request is overlapped with the others).
+    """
+    fs = SlowMemoryFileSystem({"/my_dummy_file.tsv": multiline_dummy_bytes})
+    store = {offset: ["{{u}}", offset, 0] for offset in range(10)}
+    url = "memory://my_dummy_file.tsv"
+    asyncio.run(
+        validate_ranges_async(url, store, 2, tsv_dialect, max_concurrency=max_concurrency, fs=fs)
+    )
+    assert fs.max_in_flight == max_concurrency
+
+
+def test_lazy_tasks():
+    """
+    Show that a range is only requested once a slot is freed by the consumer taking a
+    result, so a consumer which stops after the first result leaves the rest of the
+    ranges unrequested.
+    """
+    fs = SlowMemoryFileSystem({"/my_dummy_file.tsv": multiline_dummy_bytes})
+    store = {offset: ["{{u}}", offset, 0] for offset in range(10)}
+    url = "memory://my_dummy_file.tsv"
+
+    async def first_result():
+        results = iter_validate_ranges(url, store, 2, tsv_dialect, max_concurrency=3, fs=fs)
+        first = await results.__anext__()
+        await results.aclose()
+        return first
+
+    assert asyncio.run(first_result())[1] == ValidationResult(0, 0)
+    assert fs.n_requests == 3
@@ -0,0 +1,390 @@
+from __future__ import annotations
+import io
+import re
+from time import perf_counter
+from typing import Callable
+import numpy as np
+import pandas as pd
+from pandas.errors import ParserError
+import pytest
+from pytest import mark
+
+from byte_validation_test import validate_bytes
+from dialect_test import code_unit, encode_token
+from pandas_nan_validation_test import make_df, validate_df, validate_str
+from row_index_test import find_quoting, scan_row_starts
+from schema_test import CsvSchema
+from validation_result_test import ValidationResult
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
+__all__ = [
+    "block_engines",
+    "validate_block",
+    "pick_engine",
+    "validate_pandas_c",
+    "validate_pandas_python",
+    "validate_byte_engine",
+    "validate_arrow",
+    "structure_engines",
+    "arrow_options",
+    "threads_can_parse",
+    "first_cast_failure",
+]
+
+arrow_block_size = 1 << 20  # The bytes of a block parsed by each Arrow thread
+structure_engines = {"bytes"}  # The engines which do not check dtype hints
+
+
+def validate_pandas_c(data: bytes, schema: CsvSchema, encoding="utf-8") -> ValidationResult:
+    "Validate a block with the pandas C engine (see :func:`validate_str`)."
+    return validate_str(data.decode(encoding), return_rows=False, schema=schema)
+
+
+def validate_pandas_python(data: bytes, schema: CsvSchema, encoding="utf-8") -> ValidationResult:
+    "Validate a block with the pandas python engine (see :func:`make_df`)."
+    rows_str, names = data.decode(encoding), list(schema.names)
+    try:
+        df = make_df(schema.n_cols, rows_str, names, engine="python", dialect=schema.dialect)
+    except ParserError:
+        return ValidationResult(0, error_kind="parser_error")
+    return validate_df(df, return_rows=False, schema=schema)
+
+
+def validate_byte_engine(data: bytes, schema: CsvSchema, encoding="utf-8") -> ValidationResult:
+    """
+    Validate a block with :func:`validate_bytes`, giving the position of the first
+    invalid row as ``error_pos`` as the other engines do (not its byte offset, which is
+    the ``n_bytes`` validated before it). It only checks the structure of the rows, not
+    the dtype hints (see ``structure_engines``), and reports a closing quotechar
+    followed by more text (which pandas cannot parse) as a ``"quotechar"``.
+    """
+    result = validate_bytes(data, schema.n_cols, **schema.dialect.byte_kwargs(encoding))
+    error_pos = None if result.valid else result.n_rows
+    return ValidationResult(result.n_rows, result.n_bytes, error_pos, result.error_kind)
+
+
+def arrow_options(
+    schema: CsvSchema,
+    encoding="utf-8",
+    block_size: int = arrow_block_size,
+    use_threads=True,
+    invalid_row_handler: Callable | None = None,
+) -> dict[str, object]:
+    """
+    The options of :func:`pyarrow.csv.read_csv` to parse a (headerless) block of a CSV
+    with the ``schema``: every column is read as (non-null) strings, and multiline
+    fields are allowed, with rows of the wrong number of fields passed to the
+    ``invalid_row_handler`` rather than failing the parse. As for the other engines, the
+    escapechar is not given to the parser (see :class:`Dialect`).
+    """
+    dialect = schema.dialect
+    column_names = [str(name) for name in schema.names]
+    return dict(
+        read_options=pa_csv.ReadOptions(
+            column_names=column_names,
+            block_size=block_size,
+            use_threads=use_threads,
+            encoding=encoding,
+        ),
+        parse_options=pa_csv.ParseOptions(
+            delimiter=dialect.delimiter,
+            quote_char=dialect.quotechar,
+            double_quote=dialect.doublequote,
+            escape_char=False,
+            newlines_in_values=True,
+            invalid_row_handler=invalid_row_handler,
+        ),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=dict.fromkeys(column_names, pa.string()),
+            strings_can_be_null=False,
+        ),
+    )
+
+
+def threads_can_parse(data: bytes, schema: CsvSchema, encoding="utf-8", block_size=None) -> bool:
+    """
+    Whether the block may be parsed by Arrow in many threads: if its quotechars are
+    balanced and every row is shorter than half an Arrow block, so no row (or unclosed
+    quoted field) can straddle two block boundaries. That fails the parse, and a failed
+    threaded parse leaves the thread pool of pyarrow (as of version 15) unusable, so a
+    block which might do so is parsed in one thread. Found from the quotechar and row
+    start positions (see :func:`scan_row_starts`), in NumPy.
+    """
+    block_size = arrow_block_size if block_size is None else block_size
+    dialect = schema.dialect
+    arr = np.frombuffer(data, dtype=np.uint8)
+    quote, delimiter, term = (
+        encode_token(token, encoding)
+        for token in (dialect.quotechar, dialect.delimiter, dialect.lineterminator)
+    )
+    if len(find_quoting(arr, quote, delimiter, term, code_unit(encoding))) % 2:
+        return False
+    row_bounds = np.append(scan_row_starts(data, dialect, encoding), len(data))
+    return len(row_bounds) < 2 or np.diff(row_bounds).max() * 2 < block_size
+
+
+def first_cast_failure(column, dtype) -> int | None:
+    """
+    The position of the first value of an Arrow column of strings which cannot be cast
+    to the (pandas) ``dtype``, or ``None`` if they all can. The column is cast all at
+    once, and only if that fails is the failure found, by bisection (casting halves of
+    the column in turn). Empty values are null if the ``dtype`` is nullable (a pandas
+    extension dtype such as ``"Int64"``), else they cannot be cast. Dtypes which Arrow
+    does not cast strings to (such as strings) are not checked.
+    """
+    dtype = pd.api.types.pandas_dtype(dtype)
+    if dtype.kind not in "iufbM":
+        return None
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        column = pc.if_else(pc.equal(column, ""), None, column)
+        arrow_type = pa.from_numpy_dtype(dtype.numpy_dtype)
+    else:
+        arrow_type = pa.from_numpy_dtype(dtype)
+
+    def castable(values) -> bool:
+        try:
+            pc.cast(values, arrow_type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            return False
+        return True
+
+    if castable(column):
+        return None
+    start, end = 0, len(column)  # The failure is in column[start:end]
+    while end - start > 1:
+        mid = (start + end) // 2
+        if castable(column.slice(start, mid - start)):
+            start = mid
+        else:
+            end = mid
+    return start
+
+
+def validate_arrow(
+    data: bytes,
+    schema: CsvSchema,
+    encoding="utf-8",
+    block_size: int = arrow_block_size,
+    use_threads=True,
+) -> ValidationResult:
+    """
+    Validate a block with the multithreaded (and GIL-free) :mod:`pyarrow.csv` parser.
+    Rows with too few or too many fields are passed to the invalid row handler (rather
+    than padded with ``None`` cells, as pandas does), and the parsed string columns are
+    then searched for an unescaped quotechar and cast to the schema's dtype hints by
+    Arrow compute functions, without converting them to pandas.
+
+    Arrow only numbers the rows passed to the handler when parsing in one thread, so a
+    block with an invalid row is parsed again in one thread to locate it (as is a block
+    which cannot be split into Arrow blocks, see :func:`threads_can_parse`). The verdicts
+    and row positions are those of :func:`validate_str`, except that a row with too many
+    fields is an ``"excess_field"`` (which pandas cannot parse at all), as is a closing
+    quotechar followed by more text a ``"quotechar"`` (Arrow appends the text to the
+    field), and dtypes are cast as Arrow casts them.
+    """
+    invalid_rows = []
+
+    def on_invalid_row(row) -> str:
+        invalid_rows.append(row)
+        return "skip"
+
+    use_threads = use_threads and threads_can_parse(data, schema, encoding, block_size)
+    options = arrow_options(schema, encoding, block_size, use_threads, on_invalid_row)
+    try:
+        table = pa_csv.read_csv(io.BytesIO(data), **options)
+    except pa.ArrowInvalid:
+        return ValidationResult(0, error_kind="parser_error")
+    if use_threads and invalid_rows:
+        return validate_arrow(data, schema, encoding, block_size, use_threads=False)
+    errors = []  # Each error as (row position, check order, kind)
+    if invalid_rows:
+        row = min(invalid_rows, key=lambda row: row.number)
+        kind = "absent_field" if row.actual_columns < row.expected_columns else "excess_field"
+        errors.append((row.number - 1, 0, kind))
+        # The parsed rows are only numbered as in the block up to the first skipped row
+        table = table.slice(0, row.number - 1)
+    # An unescaped quotechar, as matched by ``Dialect.quote_patt`` (RE2 has no lookbehind)
+    quote_patt = re.escape(schema.dialect.quotechar)
+    if schema.dialect.escapechar is not None:
+        quote_patt = f"(?:^|[^{re.escape(schema.dialect.escapechar)}]){quote_patt}"
+    quoted_mask = np.zeros(table.num_rows, dtype=bool)
+    for column in table.columns:
+        quoted_mask |= pc.match_substring_regex(column, quote_patt).to_numpy(zero_copy_only=False)
+    if quoted_mask.any():
+        errors.append((int(quoted_mask.argmax()), 1, "quotechar"))
+    for col_name, dtype in schema.dtype_map().items():
+        row_pos = first_cast_failure(table.column(str(col_name)), dtype)
+        if row_pos is not None:
+            errors.append((row_pos, 2, "dtype"))
+    if not errors:
+        return ValidationResult(table.num_rows)
+    row_pos, _, kind = min(errors)
+    return ValidationResult(row_pos, error_pos=row_pos, error_kind=kind)
+
+
+block_engines: dict[str, Callable[[bytes, CsvSchema, str], ValidationResult]] = {
+    "pandas_c": validate_pandas_c,
+    "pandas_python": validate_pandas_python,
+    "bytes": validate_byte_engine,
+}
+if pa is not None:
+    block_engines["arrow"] = validate_arrow
+
+
+def validate_block(
+    data: bytes, schema: CsvSchema, engine: str = "pandas_c", encoding="utf-8"
+) -> ValidationResult:
+    """
+    Validate a block of a CSV (of rows without a header row) with the named engine of
+    ``block_engines``, to each of which the block's bytes, schema and encoding are given.
+    """
+    try:
+        validate = block_engines[engine]
+    except KeyError:
+        raise ValueError(f"Unknown {engine=} (expected one of {list(block_engines)})")
+    return validate(data, schema, encoding)
+
+
+def pick_engine(
+    sample: bytes,
+    schema: CsvSchema,
+    encoding="utf-8",
+    engines: list[str] | None = None,
+    repeat: int = 3,
+) -> str:
+    """
+    Pick the fastest engine for a file by timing each of the ``engines`` (default: all
+    of ``block_engines``) validating a ``sample`` of its rows (the best of ``repeat``
+    runs each), so the engine may be picked once per file and used for every block.
+    If the schema has dtype hints, ``structure_engines`` (which do not check them) are
+    not picked.
+    """
+    engines = engines or list(block_engines)
+    if schema.dtypes:
+        engines = [engine for engine in engines if engine not in structure_engines]
+    if not engines:
+        raise ValueError(f"No engine which checks the dtype hints of {schema=}")
+    timings = {}
+    for engine in engines:
+        best = float("inf")
+        for _ in range(repeat):
+            start = perf_counter()
+            validate_block(sample, schema, engine, encoding)
+            best = min(best, perf_counter() - start)
+        timings[engine] = best
+    return min(timings, key=timings.get)
+
+
+### Tests begin here
+
+typed_schema = CsvSchema.from_head(b"intA,intB,strC\n", dtypes={"intA": "int64", "intB": "Int64"})
+arrow_engines = [
+    engine if engine != "arrow" else pytest.param(engine, marks=mark.skipif(pa is None, reason=""))
+    for engine in ["pandas_c", "pandas_python", "arrow"]
+]
+untyped_schema = CsvSchema(typed_schema.names, typed_schema.dialect)
+
+
+@mark.parametrize("engine", [*arrow_engines, "bytes"])
+@mark.parametrize(
+    "rows_bytes,expected",
+    [
+        (b'1,2,hello\n3,,"wor\nld"\n', ValidationResult(2)),
+        (b"1,2,hello\n\n3,4\n5,6,world\n", ValidationResult(1, None, 1, "absent_field")),
+        (b'1,2,hello\n3,4,ba"z\n', ValidationResult(1, None, 1, "quotechar")),
+        (b"1,2,hello\n3,4,world\nx,5,foo\n", ValidationResult(2, None, 2, "dtype")),
+        (b"1,2,hello\n,4,world\n", ValidationResult(1, None, 1, "dtype")),
+        (b'1,x,"he\nllo"\n3,4,foo\n', ValidationResult(0, None, 0, "dtype")),
+        (b'1,2,a\\"b\n', ValidationResult(1)),
+        (b'1,2,"a\\"b"\n', ValidationResult(0, None, None, "parser_error")),
+        (b'1,2,"a\\"\n3,4,5\n', ValidationResult(2)),
+    ],
+)
+def test_engines_agree(engine, rows_bytes, expected):
+    """
+    Show that every engine reaches the same verdict on each block, at the same row,
+    including an absent field after a multiline field and a blank line, and that the
+    escapechar only excuses a quotechar after it in a field value (as none of the
+    parsers are given it, it does not escape a quotechar which closes a field). A
+    closing quotechar followed by more text, which pandas cannot parse, is a quotechar
+    in the field to the engines which can, and the engines which do not check dtype
+    hints are given a schema without them.
+    """
+    schema = typed_schema
+    if engine in structure_engines:
+        schema = untyped_schema
+        if expected.error_kind == "dtype":
+            expected = ValidationResult(len(scan_row_starts(rows_bytes, schema.dialect)))
+    if engine in ("arrow", "bytes") and expected.error_kind == "parser_error":
+        expected = ValidationResult(expected.n_rows, None, expected.n_rows, "quotechar")
+    result = validate_block(rows_bytes, schema, engine)
+    result.n_bytes = None  # Only counted by the bytes engine
+    assert result == expected
+
+
+@mark.skipif(pa is None, reason="pyarrow is not installed")
+@mark.parametrize("use_threads", [True, False])
+@mark.parametrize("invalid_row", [None, b"5,6\n", b"5,6,7,8\n", b'5,6,"7\n'])
+def test_arrow_blocks(invalid_row, use_threads):
+    """
+    Show that a block parsed by many Arrow threads (in blocks much smaller than it) gets
+    the verdict it gets in one thread, with an invalid row located in either case, and
+    that an unclosed quoted field (which would straddle the Arrow blocks) fails the
+    parse in one thread.
+    """
+    rows = [f"{i},{i + 1},row {i}\n".encode() for i in range(2000)]
+    if invalid_row is not None:
+        rows.insert(1500, invalid_row)
+    data = b"".join(rows)
+    result = validate_arrow(data, typed_schema, block_size=1 << 10, use_threads=use_threads)
+    expected = {
+        None: ValidationResult(2000),
+        b"5,6\n": ValidationResult(1500, None, 1500, "absent_field"),
+        b"5,6,7,8\n": ValidationResult(1500, None, 1500, "excess_field"),
+        b'5,6,"7\n': ValidationResult(0, error_kind="parser_error"),
+    }[invalid_row]
+    assert result == expected
+
+
+def test_pick_engine():
+    """
+    Show that the fastest engine on a sample is picked from those given.
+    """
+    sample = b"".join(f"{i},{i + 1},row {i}\n".encode() for i in range(100))
+    assert pick_engine(sample, typed_schema, repeat=1) in block_engines
+    assert pick_engine(sample, untyped_schema, engines=["bytes"], repeat=1) == "bytes"
+
+
+def test_pick_engine_dtypes():
+    """
+    Show that an engine which does not check dtype hints is not picked for a schema
+    which has them.
+    """
+    sample = b"".join(f"{i},{i + 1},row {i}\n".encode() for i in range(100))
+    assert pick_engine(sample, typed_schema, engines=["pandas_c", "bytes"], repeat=1) == "pandas_c"
+    with pytest.raises(ValueError, match="No engine"):
+        pick_engine(sample, typed_schema, engines=["bytes"], repeat=1)
+
+
+@mark.skipif(pa is None, reason="pyarrow is not installed")
+@mark.parametrize(
+    "data,expected",
+    [
+        (b'1,2,"he\nllo"\n3,4,world\n', True),
+        (b'1,2,"he\nllo\n3,4,world\n', False),
+        (b"1,2," + b"x" * 600 + b"\n3,4,world\n", False),
+        (b"", True),
+    ],
+)
+def test_threads_can_parse(data, expected):
+    """
+    Show that a block with an unclosed quote, or a row over half an Arrow block long,
+    is not parsed in many threads.
+    """
+    assert threads_can_parse(data, typed_schema, block_size=1 << 10) == expected
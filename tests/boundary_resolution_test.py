@@ -0,0 +1,602 @@
+from __future__ import annotations
+import math
+import mmap
+from pytest import mark, raises
+
+from byte_validation_test import validate_bytes
+from dialect_test import Dialect
+from instrumentation_test import collect, count, instrument, reject
+from quote_parity_test import QuoteParityIndex
+from validation_result_test import ValidationResult
+from verdict_cache_test import VerdictCache
+
+__all__ = [
+    "forward_window_end",
+    "backward_window_start",
+    "validate_forward_window",
+    "validate_backward_window",
+    "is_row_start",
+    "window_key",
+    "resolution_key",
+    "AdaptiveWindow",
+    "is_row_start_adaptive",
+    "resolve_boundary",
+]
+
+
+def forward_window_end(buf, offset: int, n_lines: int, lineterminator=b"\n") -> int:
+    "The end of the window of up to ``n_lines`` lines from ``offset`` (at most ``len(buf)``)."
+    fwd_end = offset
+    for _ in range(n_lines):
+        term_pos = buf.find(lineterminator, fwd_end)
+        if term_pos == -1:
+            return len(buf)
+        fwd_end = term_pos + len(lineterminator)
+    return fwd_end
+
+
+def backward_window_start(buf, offset: int, n_lines: int, lineterminator=b"\n") -> int:
+    """
+    The start of the window of up to ``n_lines`` lines before ``offset`` (just after a
+    lineterminator), which is the lineterminator before the first of them, or else 0.
+    """
+    bwd_start = offset - len(lineterminator)
+    for _ in range(n_lines):
+        term_pos = buf.rfind(lineterminator, 0, bwd_start)
+        if term_pos == -1:
+            return 0
+        bwd_start = term_pos
+    return bwd_start
+
+
+def validate_forward_window(
+    buf,
+    offset: int,
+    n_cols: int,
+    n_lines: int,
+    delimiter=b",",
+    quotechar=b'"',
+    escapechar=b"\\",
+    lineterminator=b"\n",
+) -> tuple[ValidationResult, int, bool]:
+    """
+    Validate a window of up to ``n_lines`` lines from ``offset`` with :func:`validate_bytes`.
+
+    Returns:
+      The :class:`ValidationResult`, the length of the window, and whether the window
+      reaches the end of ``buf`` (so its last row was checked too).
+    """
+    buf_len = len(buf)
+    fwd_end = forward_window_end(buf, offset, n_lines, lineterminator)
+    result = validate_bytes(
+        buf,
+        n_cols,
+        delimiter=delimiter,
+        quotechar=quotechar,
+        escapechar=escapechar,
+        lineterminator=lineterminator,
+        start=offset,
+        end=fwd_end,
+        final=fwd_end == buf_len,
+    )
+    return result, fwd_end - offset, fwd_end == buf_len
+
+
+def validate_backward_window(
+    buf,
+    offset: int,
+    n_cols: int,
+    n_lines: int,
+    delimiter=b",",
+    quotechar=b'"',
+    escapechar=b"\\",
+    lineterminator=b"\n",
+) -> tuple[ValidationResult, int, bool]:
+    """
+    Validate a window of up to ``n_lines`` lines before ``offset`` right to left (a
+    reversed copy of just that window), so that a quotechar which opened a multiline
+    field that the offset falls inside is found to be closing a field early.
+
+    Returns:
+      The :class:`ValidationResult`, the length of the window, and whether the window
+      reaches the start of ``buf`` (so its last row, the first row of ``buf``, was
+      checked too).
+    """
+    bwd_start = backward_window_start(buf, offset, n_lines, lineterminator)
+    rev_window = bytes(buf[bwd_start:offset])[::-1]
+    result = validate_bytes(
+        rev_window,
+        n_cols,
+        delimiter=delimiter,
+        quotechar=quotechar,
+        escapechar=None,  # An escapechar would follow (not precede) what it escapes
+        lineterminator=lineterminator[::-1],
+        final=bwd_start == 0,
+    )
+    return result, offset - bwd_start, bwd_start == 0
+
+
+window_validators = {"forward": validate_forward_window, "backward": validate_backward_window}
+
+
+def is_row_start(
+    buf,
+    offset: int,
+    n_cols: int,
+    window_rows: int = 2,
+    delimiter=b",",
+    quotechar=b'"',
+    escapechar=b"\\",
+    lineterminator=b"\n",
+) -> bool:
+    """
+    Check whether ``offset`` (just after a lineterminator) is the start of a row, by
+    validating a window of up to ``window_rows`` lines on either side of it with
+    :func:`validate_forward_window` and :func:`validate_backward_window`.
+
+    Args:
+      buf         : A bytes-like object supporting ``find`` and ``rfind`` (:class:`bytes`
+                    or :class:`mmap.mmap`)
+      window_rows : The number of lines to validate in each direction (default: 2)
+    """
+    dialect_kwargs = dict(
+        delimiter=delimiter,
+        quotechar=quotechar,
+        escapechar=escapechar,
+        lineterminator=lineterminator,
+    )
+    for direction, validate_window in window_validators.items():
+        result, _, _ = validate_window(buf, offset, n_cols, window_rows, **dialect_kwargs)
+        if not result.valid:
+            reject(f"{direction}_{result.error_kind}")
+            return False
+    return True
+
+
+def window_key(
+    buf,
+    offset: int,
+    n_cols: int,
+    window_rows: int = 2,
+    delimiter=b",",
+    quotechar=b'"',
+    escapechar=b"\\",
+    lineterminator=b"\n",
+) -> bytes:
+    """
+    The :class:`VerdictCache` key of the verdict of :func:`is_row_start`: a hash of the
+    bytes of both its windows (split at ``offset``, and whether each reaches an edge of
+    ``buf``) and of its arguments, which decide the verdict wherever the windows are in
+    whichever file. The windows are found (but not validated) as by the validators.
+    """
+    bwd_start = backward_window_start(buf, offset, window_rows, lineterminator)
+    fwd_end = forward_window_end(buf, offset, window_rows, lineterminator)
+    args = (n_cols, window_rows, delimiter, quotechar, escapechar, lineterminator)
+    edges = (bwd_start == 0, fwd_end == len(buf))
+    return VerdictCache.key(
+        repr((args, edges)).encode(), buf[bwd_start:offset], buf[offset:fwd_end]
+    )
+
+
+def resolution_key(
+    buf,
+    offset: int,
+    span_end: int,
+    n_cols: int,
+    window_rows: int = 2,
+    delimiter=b",",
+    quotechar=b'"',
+    escapechar=b"\\",
+    lineterminator=b"\n",
+) -> bytes:
+    """
+    The :class:`VerdictCache` key of the offset which :func:`resolve_boundary` resolves
+    the candidate ``offset`` to: a hash of the bytes from the start of its backward
+    window to ``span_end`` (the end of the forward window of the offset resolved to), in
+    which lie the windows of every candidate checked on the way, and of the arguments
+    and edges as in :func:`window_key`.
+    """
+    bwd_start = backward_window_start(buf, offset, window_rows, lineterminator)
+    args = ("resolved", n_cols, window_rows, delimiter, quotechar, escapechar, lineterminator)
+    edges = (bwd_start == 0, span_end == len(buf))
+    return VerdictCache.key(
+        repr((args, edges)).encode(), buf[bwd_start:offset], buf[offset:span_end]
+    )
+
+
+class AdaptiveWindow:
+    """
+    The state of :func:`is_row_start_adaptive` for one file: the bounds on the number of
+    rows to validate either side of a candidate row start, and the typical row length
+    (in lines, which is more than one with multiline fields) learnt from the windows
+    validated so far.
+
+    Attributes:
+      min_rows          : The number of rows in the first window tried (default: 1)
+      max_rows          : The most rows a window is grown to (default: 64)
+      n_rows            : The number of rows validated in forward windows so far
+      n_lines           : The number of lines in those rows
+      n_bytes_validated : The total length of all the windows validated so far
+    """
+
+    __slots__ = ("min_rows", "max_rows", "n_rows", "n_lines", "n_bytes_validated")
+
+    def __init__(self, min_rows: int = 1, max_rows: int = 64):
+        self.min_rows = min_rows
+        self.max_rows = max_rows
+        self.n_rows = 0
+        self.n_lines = 0
+        self.n_bytes_validated = 0
+
+    @property
+    def lines_per_row(self) -> float:
+        "The mean number of lines per row validated so far (1 before any are)."
+        return self.n_lines / self.n_rows if self.n_rows else 1.0
+
+
+def is_row_start_adaptive(
+    buf,
+    offset: int,
+    n_cols: int,
+    window: AdaptiveWindow,
+    delimiter=b",",
+    quotechar=b'"',
+    escapechar=b"\\",
+    lineterminator=b"\n",
+) -> bool:
+    """
+    Check whether ``offset`` is the start of a row as in :func:`is_row_start`, but with
+    windows sized to ``window.min_rows`` typical rows, each grown geometrically (up to
+    ``window.max_rows``) only while it is ambiguous: valid, yet without a single complete
+    row (as when the window is all inside one open quoted field). The typical row length
+    of the file is updated from every forward window validated.
+    """
+    dialect_kwargs = dict(
+        delimiter=delimiter,
+        quotechar=quotechar,
+        escapechar=escapechar,
+        lineterminator=lineterminator,
+    )
+    for direction, validate_window in window_validators.items():
+        n_rows = window.min_rows
+        while True:
+            n_lines = math.ceil(n_rows * window.lines_per_row)
+            result, n_bytes, at_edge = validate_window(
+                buf, offset, n_cols, n_lines, **dialect_kwargs
+            )
+            window.n_bytes_validated += n_bytes
+            if not result.valid or result.n_rows or at_edge or n_rows >= window.max_rows:
+                break
+            n_rows *= 2
+        if not result.valid:
+            reject(f"{direction}_{result.error_kind}")
+            return False
+        if direction == "forward" and result.n_rows:
+            window.n_rows += result.n_rows
+            window_bytes = buf[offset : offset + result.n_bytes]  # mmap.mmap has no count
+            window.n_lines += window_bytes.count(lineterminator)
+    return True
+
+
+@instrument("resolve_boundary")
+def resolve_boundary(
+    buf,
+    guess_offset: int,
+    n_cols: int,
+    window_rows: int = 2,
+    delimiter=b",",
+    quotechar=b'"',
+    escapechar=b"\\",
+    lineterminator=b"\n",
+    quote_index: QuoteParityIndex | None = None,
+    window: AdaptiveWindow | None = None,
+    cache: VerdictCache | None = None,
+) -> int:
+    """
+    Advance a partition start position guessed from the blocksize to the first offset
+    at or after it which begins a row, walking forward one lineterminator at a time and
+    checking each candidate with :func:`is_row_start`. Only a bounded window around each
+    candidate is ever validated, never the whole block.
+
+    Args:
+      quote_index : A :class:`QuoteParityIndex` of ``buf``, with which to check each
+                    candidate by the parity of the quotechars before it instead (in a
+                    lookup and a scan of at most its ``checkpoint_bytes``), which needs
+                    no re-parsing of the rows either side of it.
+      window      : An :class:`AdaptiveWindow` (shared by all the boundaries of a file)
+                    with which to check each candidate by :func:`is_row_start_adaptive`
+                    instead of with a fixed ``window_rows``.
+      cache       : A :class:`VerdictCache` of the offsets resolved to (keyed by
+                    :func:`resolution_key`, and found by the span of bytes last resolved
+                    over from the first candidate) and of the verdicts of
+                    :func:`is_row_start` (keyed by :func:`window_key`), so a boundary or
+                    candidate whose bytes have been checked before (in this file or
+                    another) is not validated again. It is not used with a
+                    ``quote_index`` (which validates nothing), and cannot be used with an
+                    adaptive ``window`` (whose verdicts vary with what it has learnt).
+
+    Returns:
+      The resolved offset, or ``len(buf)`` if there is no row start after the guess.
+    """
+    if cache is not None and window is not None:
+        raise ValueError("A cache cannot be used with an adaptive window")
+    if guess_offset <= 0:
+        return 0
+    dialect_kwargs = dict(
+        delimiter=delimiter,
+        quotechar=quotechar,
+        escapechar=escapechar,
+        lineterminator=lineterminator,
+    )
+    term_pos = buf.find(lineterminator, guess_offset - len(lineterminator))
+    first_offset = term_pos + len(lineterminator)
+    use_cache = cache is not None and quote_index is None
+    use_cache = use_cache and term_pos != -1 and first_offset < len(buf)
+    if use_cache:
+        first_key = window_key(buf, first_offset, n_cols, window_rows, **dialect_kwargs)
+        span_key = VerdictCache.key(b"span", first_key)
+        span = cache.get(span_key)
+        if span is not None:
+            span_end = first_offset + span
+            key = resolution_key(buf, first_offset, span_end, n_cols, window_rows, **dialect_kwargs)
+            resolved = cache.get(key)
+            if resolved is not None:
+                count("cached_resolutions")
+                return first_offset + resolved
+    resolved = len(buf)
+    while term_pos != -1:
+        offset = term_pos + len(lineterminator)
+        if offset >= len(buf):
+            break
+        if quote_index is not None:
+            if quote_index.is_row_terminating(term_pos):
+                resolved = offset
+                break
+            reject("in_quotes")
+        elif window is not None:
+            if is_row_start_adaptive(
+                buf,
+                offset,
+                n_cols,
+                window,
+                delimiter=delimiter,
+                quotechar=quotechar,
+                escapechar=escapechar,
+                lineterminator=lineterminator,
+            ):
+                resolved = offset
+                break
+        else:
+            key = verdict = None
+            if cache is not None:
+                key = window_key(buf, offset, n_cols, window_rows, **dialect_kwargs)
+                verdict = cache.get(key)
+            if verdict is None:
+                verdict = is_row_start(buf, offset, n_cols, window_rows, **dialect_kwargs)
+                if cache is not None:
+                    cache.put(key, verdict)
+            else:
+                count("cached_verdicts")
+            if verdict:
+                resolved = offset
+                break
+        term_pos = buf.find(lineterminator, offset)
+    if use_cache:
+        span_end = len(buf)
+        if resolved < len(buf):
+            span_end = forward_window_end(buf, resolved, window_rows, lineterminator)
+        key = resolution_key(buf, first_offset, span_end, n_cols, window_rows, **dialect_kwargs)
+        cache.put(span_key, span_end - first_offset)
+        cache.put(key, resolved - first_offset)
+    return resolved
+
+
+### Tests begin here
+
+simple_dummy_bytes = b"it\ts\nme\tlo\nuis\t:)\nhel\tlo\nwor\tld\naga\tin...!\n"
+multiline_dummy_bytes = b'it\ts\nme\tlo\nuis\t:)\nhel\t"lo\nwor\tld"\naga\tin...!\n'
+
+
+def evaluate_partitions(buf, n_columns, blocksize, window=None):
+    """
+    Resolve the boundary for every blocksize multiple into the partitions ``store``
+    format, skipping duplicate and EOF offsets (as in ``offsets-calc.py``).
+    """
+    guesses = range(0, len(buf), blocksize)
+    resolved = [
+        resolve_boundary(buf, g, n_columns, delimiter=b"\t", window=window) for g in guesses
+    ]
+    offsets = sorted({offset for offset in resolved if offset < len(buf)})
+    return {
+        start: ["{{u}}", start, end - start]
+        for start, end in zip(offsets, [*offsets[1:], len(buf)])
+    }
+
+
+@mark.parametrize(
+    "file_bytes,blocksize,expected",
+    [
+        (
+            simple_dummy_bytes,
+            10,
+            {0: ["{{u}}", 0, 11], 11: ["{{u}}", 11, 14], 25: ["{{u}}", 25, 7], 32: ["{{u}}", 32, 11]},
+        ),
+        (
+            simple_dummy_bytes,
+            20,
+            {0: ["{{u}}", 0, 25], 25: ["{{u}}", 25, 18]},
+        ),
+        (
+            multiline_dummy_bytes,
+            5,
+            {
+                0: ["{{u}}", 0, 5],
+                5: ["{{u}}", 5, 6],
+                11: ["{{u}}", 11, 7],
+                18: ["{{u}}", 18, 16],
+                34: ["{{u}}", 34, 11],
+            },
+        ),
+        (
+            multiline_dummy_bytes,
+            10,
+            {0: ["{{u}}", 0, 11], 11: ["{{u}}", 11, 23], 34: ["{{u}}", 34, 11]},
+        ),
+        (
+            multiline_dummy_bytes,
+            20,
+            {0: ["{{u}}", 0, 34], 34: ["{{u}}", 34, 11]},
+        ),
+    ],
+)
+@mark.parametrize("adaptive", [False, True])
+def test_resolved_partitions(file_bytes, blocksize, expected, adaptive):
+    """
+    Show that resolving each blocksize guess reproduces the ``offsets-calc*.py`` stores,
+    with fixed or adaptive windows.
+    """
+    window = AdaptiveWindow() if adaptive else None
+    assert evaluate_partitions(file_bytes, 2, blocksize, window) == expected
+
+
+@mark.parametrize(
+    "guess_offset,expected",
+    [(20, 34), (26, 34), (34, 34), (35, 45)],
+)
+@mark.parametrize("checkpoint_bytes", [None, 4, 4096])
+def test_resolve_multiline_boundary(guess_offset, expected, checkpoint_bytes):
+    """
+    Show that the non-row-terminating newline (before offset 26) inside the multiline
+    field is skipped over to the next one, which ends the row, at offset 34 (whether
+    found by validating windows or from a quote parity index).
+    """
+    quote_index = None
+    if checkpoint_bytes is not None:
+        dialect = Dialect(delimiter="\t")
+        quote_index = QuoteParityIndex(
+            multiline_dummy_bytes, dialect, checkpoint_bytes=checkpoint_bytes
+        )
+    resolved = resolve_boundary(
+        multiline_dummy_bytes, guess_offset, 2, delimiter=b"\t", quote_index=quote_index
+    )
+    assert resolved == expected
+
+
+@mark.parametrize(
+    "offset,expected,min_bytes",
+    [(26, False, 8), (34, True, 16 + 11)],
+)
+def test_adaptive_window_grows(offset, expected, min_bytes):
+    """
+    Show that the one row windows around offset 34 (after the multiline field) are
+    ambiguous, the backward window being all inside the field when reversed, so the
+    window is grown until it completes a row, while the quotechar in the one row forward
+    window from offset 26 (inside the field) makes it conclusive at once.
+    """
+    window = AdaptiveWindow()
+    verdict = is_row_start_adaptive(multiline_dummy_bytes, offset, 2, window, delimiter=b"\t")
+    assert verdict == expected
+    assert window.n_bytes_validated >= min_bytes
+    assert window.n_bytes_validated < len(multiline_dummy_bytes)
+
+
+def test_adaptive_window_bytes():
+    """
+    Show that on a file of single line rows the adaptive windows stay at one row either
+    side of each boundary, validating a fraction of the bytes of fixed 16 row windows.
+    """
+    buf = b"".join(b"%d\t%d\n" % (i, i * i) for i in range(2000))
+    window = AdaptiveWindow()
+    for guess in range(1000, len(buf), 1000):
+        resolve_boundary(buf, guess, 2, delimiter=b"\t", window=window)
+    assert window.lines_per_row == 1
+    fixed_bytes = 0
+    for guess in range(1000, len(buf), 1000):
+        offset = resolve_boundary(buf, guess, 2, delimiter=b"\t", window_rows=16)
+        for validate_window in (validate_forward_window, validate_backward_window):
+            _, n_bytes, _ = validate_window(buf, offset, 2, 16, delimiter=b"\t")
+            fixed_bytes += n_bytes
+    assert window.n_bytes_validated * 8 < fixed_bytes
+
+
+@mark.parametrize("adaptive", [False, True])
+def test_resolve_mmap_boundary(tmp_path, adaptive):
+    """
+    Show that boundaries are resolved on a memory map of the file as on its bytes, with
+    a fixed or an adaptive window.
+    """
+    file_path = tmp_path / "my_dummy_file.tsv"
+    file_path.write_bytes(multiline_dummy_bytes)
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        window = AdaptiveWindow() if adaptive else None
+        offsets = [resolve_boundary(mm, g, 2, delimiter=b"\t", window=window) for g in (5, 20)]
+    assert offsets == [5, 34]
+
+
+def test_resolve_boundary_instrumented():
+    """
+    Show that the candidate inside the multiline field (offset 26) is recorded as
+    rejected for its quotechar in the forward window, before offset 34 is accepted.
+    """
+    with collect() as collector:
+        resolve_boundary(multiline_dummy_bytes, 20, 2, delimiter=b"\t")
+    assert collector.rejections == {"forward_quotechar": 1}
+    assert collector.stages["resolve_boundary"][0] == 1
+    assert collector.stages["validate_bytes"][0] == 3
+
+
+@mark.parametrize("persist", [False, True])
+def test_resolve_boundary_cached(tmp_path, persist):
+    """
+    Show that resolving the same boundaries again (with a cache in memory, or a new one
+    on the same file) validates nothing and gives the offsets resolved before from the
+    cache, and that after rows are appended only the candidates near the new tail are
+    validated.
+    """
+    path = tmp_path / "verdicts.sqlite" if persist else None
+    buf = multiline_dummy_bytes * 50
+    guesses = range(0, len(buf), 20)
+    cache = VerdictCache(path)
+
+    def resolve_all(buf, cache):
+        with collect() as collector:
+            offsets = [
+                resolve_boundary(buf, g, 2, delimiter=b"\t", cache=cache) for g in guesses
+            ]
+        return offsets, collector.stages.get("validate_bytes", (0,))[0], collector
+
+    expected, n_uncached, _ = resolve_all(buf, None)
+    offsets, n_validated, _ = resolve_all(buf, cache)
+    assert offsets == expected
+    assert 0 < n_validated < n_uncached  # The windows repeat with the rows
+    if persist:
+        cache.close()
+        cache = VerdictCache(path)
+    offsets, n_validated, collector = resolve_all(buf, cache)
+    assert (offsets, n_validated) == (expected, 0)
+    n_resolved = sum(0 < g and buf.find(b"\n", g - 1) + 1 < len(buf) for g in guesses)
+    assert collector.events["cached_resolutions"] == n_resolved
+    assert "cached_verdicts" not in collector.events
+    appended = multiline_dummy_bytes[:34] + b"new\trow\n"
+    offsets, n_validated, _ = resolve_all(buf[:-11] + appended, cache)
+    assert offsets == [
+        resolve_boundary(buf[:-11] + appended, g, 2, delimiter=b"\t") for g in guesses
+    ]
+    assert 0 < n_validated <= 8
+    cache.close()
+
+
+def test_resolve_boundary_cache_adaptive():
+    """
+    Show that a cache cannot be combined with an adaptive window, whose verdicts vary
+    with the state it has learnt.
+    """
+    with raises(ValueError, match="adaptive window"):
+        resolve_boundary(
+            multiline_dummy_bytes,
+            20,
+            2,
+            delimiter=b"\t",
+            window=AdaptiveWindow(),
+            cache=VerdictCache(),
+        )
@@ -0,0 +1,389 @@
+from __future__ import annotations
+from functools import lru_cache
+import random
+import re
+import numpy as np
+from pytest import mark
+
+from dialect_test import Dialect
+from instrumentation_test import instrument
+from pandas_nan_validation_test import validate_str
+from schema_test import CsvSchema
+from validation_result_test import ValidationResult
+
+__all__ = ["validate_bytes", "check_unquoted_rows", "compile_special_patt", "find_all"]
+
+skip_ahead_bytes = 1024  # The least distance to the next quotechar to check rows at once
+
+
+@instrument(
+    "validate_bytes",
+    measure=lambda result, *args, **kwargs: (result.n_bytes, result.n_rows),
+)
+def validate_bytes(
+    buf,
+    n_cols: int,
+    delimiter=b",",
+    quotechar=b'"',
+    escapechar=b"\\",
+    doublequote=True,
+    lineterminator=b"\n",
+    start: int = 0,
+    end: int | None = None,
+    final: bool = True,
+    unit: int = 1,
+) -> ValidationResult:
+    """
+    Validate that the bytes ``buf[start:end]`` split cleanly into rows of ``n_cols``
+    fields, without decoding the bytes or allocating any field values. Arguments other
+    than those below are the byte equivalents of those passed to
+    :function:`pandas.read_csv` (each a single code unit, except the ``lineterminator``
+    which may be any number of them, such as ``b"\\r\\n"``).
+
+    A quote-aware state machine is run over only the 'special' bytes of the block (the
+    delimiter, quotechar and lineterminator), located by a compiled regex which is given
+    the range bounds rather than a sliced copy of the buffer. Wherever the next quotechar
+    is at least ``skip_ahead_bytes`` away, the rows up to it are instead checked all at
+    once by :func:`check_unquoted_rows`. A row is invalid if it has too few (absent) or
+    too many fields, or if it has a quotechar anywhere other than at the start of a field
+    (or closing a quoted field), unless it is within an unquoted field just after the
+    ``escapechar``. Blank lines are skipped, as they are by pandas.
+
+    The escapechar escapes nothing else, as the rows are parsed by the DataFrame-based
+    validators (see :class:`Dialect`): a quotechar after it still opens or closes a
+    quoted field, and a delimiter or lineterminator after it still ends a field.
+
+    Args:
+      buf   : A bytes-like object (:class:`bytes`, :class:`memoryview`, :class:`mmap.mmap`)
+      start : The offset in ``buf`` at which the block begins (default: 0)
+      end   : The offset in ``buf`` at which the block ends (default: ``len(buf)``)
+      final : Whether the block ends at a row boundary, so that an unterminated last
+              row (including an unclosed quoted field) is invalid. If ``False`` the
+              block is a window onto a longer buffer and that last row is not checked.
+      unit  : The width of the code units of the encoding (see :func:`code_unit`), so
+              that the (widened) tokens of UTF-16 or UTF-32 are only matched at a
+              multiple of the code unit from ``start``. Each token is told apart by
+              the one byte of its first code unit which is not zero.
+
+    Returns:
+      A :class:`ValidationResult` with the number of rows and bytes validated and, if
+      the block is invalid, the offset of the first invalid row in ``buf`` and why.
+    """
+    end = len(buf) if end is None else end
+    special_patt = compile_special_patt(delimiter, quotechar, lineterminator)
+    quoting_patt = compile_special_patt(None, quotechar, None)
+    key = next((k for k in range(unit) if quotechar[k]), 0)  # The non-zero byte of a token
+    quote_ord, term_ord, term_len = quotechar[key], lineterminator[key], len(lineterminator)
+    row_start = field_start = start
+    n_fields = 1
+    n_rows = 0
+    in_quotes = False
+    closed_at = None  # The offset just after a closing quotechar in the current field
+    next_quote = -1  # The offset of the next quotechar (or ``end``)
+    while row_start < end:
+        if next_quote < row_start:
+            quote_match = quoting_patt.search(buf, row_start, end)
+            next_quote = quote_match.start() if quote_match else end
+        if next_quote - row_start >= skip_ahead_bytes:
+            n_checked, row_start, kind = check_unquoted_rows(
+                buf, n_cols, delimiter, lineterminator, row_start, next_quote, unit
+            )
+            n_rows += n_checked
+            if kind is not None:
+                return ValidationResult(n_rows, row_start - start, row_start, kind)
+        field_start = row_start
+        skip_at = None  # The offset of the second quotechar of a doubled quotechar
+        for match in special_patt.finditer(buf, row_start, end):
+            i = match.start()
+            if i == skip_at or (unit > 1 and (i - start) % unit):
+                continue  # Doubled, or straddling two code units
+            byte = buf[i + key]
+            if byte == quote_ord:
+                if in_quotes:
+                    if not (doublequote and i + unit < end and buf[i + unit + key] == quote_ord):
+                        in_quotes = False
+                        closed_at = i + unit
+                        continue
+                    skip_at = i + unit  # A doubled quotechar is a literal quotechar
+                elif i == field_start:
+                    in_quotes = True
+                    continue
+                # A quotechar in the field value (doubled, or in an unquoted field)
+                escaped = escapechar is not None and buf[i - unit : i] == escapechar
+                if closed_at is not None or not escaped:
+                    return ValidationResult(n_rows, row_start - start, row_start, "quotechar")
+            elif in_quotes:
+                continue
+            else:
+                if closed_at is not None and i != closed_at:
+                    # Field continues after its closing quotechar
+                    return ValidationResult(n_rows, row_start - start, row_start, "quotechar")
+                closed_at = None
+                if byte != term_ord or match.end() - i != term_len:  # The delimiter
+                    n_fields += 1
+                    field_start = i + unit
+                    continue
+                if i != row_start:
+                    if n_fields != n_cols:
+                        kind = "absent_field" if n_fields < n_cols else "excess_field"
+                        return ValidationResult(n_rows, row_start - start, row_start, kind)
+                    n_rows += 1
+                row_start = field_start = i + term_len
+                n_fields = 1
+                if next_quote < row_start:
+                    quote_match = quoting_patt.search(buf, row_start, end)
+                    next_quote = quote_match.start() if quote_match else end
+                if next_quote - row_start >= skip_ahead_bytes:
+                    break
+        else:
+            break  # Reached the end of the block
+    if final and row_start < end:
+        if in_quotes:
+            return ValidationResult(n_rows, row_start - start, row_start, "open_quote")
+        if closed_at is not None and closed_at != end:
+            return ValidationResult(n_rows, row_start - start, row_start, "quotechar")
+        if n_fields != n_cols:
+            kind = "absent_field" if n_fields < n_cols else "excess_field"
+            return ValidationResult(n_rows, row_start - start, row_start, kind)
+        return ValidationResult(n_rows + 1, end - start)
+    return ValidationResult(n_rows, min(row_start, end) - start)
+
+
+def check_unquoted_rows(
+    buf,
+    n_cols: int,
+    delimiter=b",",
+    lineterminator=b"\n",
+    start: int = 0,
+    end: int | None = None,
+    unit: int = 1,
+) -> tuple[int, int, str | None]:
+    """
+    Check the field counts of all the rows terminated within ``buf[start:end]``, which
+    must contain no quotechar, at once. The lineterminators and delimiters
+    are found by array comparisons over a (zero-copy) NumPy view of the buffer, and the
+    delimiters per row counted by binary search between the lineterminators.
+
+    Returns:
+      A tuple of the number of (non-blank) rows checked, the offset of the first invalid
+      row (or else of the byte after the last lineterminator), and the kind of error in
+      the invalid row (or ``None`` if all the rows are valid).
+    """
+    end = len(buf) if end is None else end
+    arr = np.frombuffer(buf, dtype=np.uint8)[start:end]
+    term_pos = find_all(arr, lineterminator, unit)
+    if len(term_pos) == 0:
+        return 0, start, None
+    row_starts = np.concatenate([[0], term_pos[:-1] + len(lineterminator)])
+    delim_pos = find_all(arr[: term_pos[-1]], delimiter, unit)
+    n_fields = np.searchsorted(delim_pos, term_pos) - np.searchsorted(delim_pos, row_starts) + 1
+    non_blank = term_pos > row_starts
+    invalid = non_blank & (n_fields != n_cols)
+    if invalid.any():
+        idx = invalid.argmax()
+        kind = "absent_field" if n_fields[idx] < n_cols else "excess_field"
+        return int(non_blank[:idx].sum()), start + int(row_starts[idx]), kind
+    return int(non_blank.sum()), start + int(term_pos[-1]) + len(lineterminator), None
+
+
+@lru_cache(maxsize=32)
+def compile_special_patt(delimiter, quotechar, lineterminator) -> re.Pattern:
+    """
+    Compile a regex to find the 'special' bytes (any of which may be ``None``). Single
+    byte tokens are matched in one character class, which is much faster to search for
+    than alternatives (as are needed for a lineterminator several bytes long, or for the
+    tokens of UTF-16, which are two bytes long).
+    """
+    tokens = [token for token in (delimiter, quotechar, lineterminator) if token]
+    single_bytes = b"".join(token for token in tokens if len(token) == 1)
+    alternatives = [
+        re.escape(token) for token in sorted(tokens, key=len, reverse=True) if len(token) > 1
+    ]
+    if single_bytes:
+        alternatives.append(b"[" + re.escape(single_bytes) + b"]")
+    return re.compile(b"|".join(alternatives))
+
+
+def find_all(arr: np.ndarray, token: bytes, unit: int = 1) -> np.ndarray:
+    """
+    Find the positions of every (non-overlapping) occurrence of ``token`` in the array of
+    bytes, by comparing the whole array to its first byte then filtering the matches by
+    each subsequent byte. With a ``unit`` (the code unit width of the encoding) of more
+    than 1 byte, only the occurrences at a multiple of the code unit are found.
+    """
+    positions = np.flatnonzero(arr[: max(len(arr) - len(token) + 1, 0)] == token[0])
+    if unit > 1:
+        positions = positions[positions % unit == 0]
+    for k in range(1, len(token)):
+        positions = positions[arr[positions + k] == token[k]]
+    if len(token) > 1 and (np.diff(positions) < len(token)).any():
+        kept = []
+        for pos in positions.tolist():
+            if not kept or pos >= kept[-1] + len(token):
+                kept.append(pos)
+        positions = np.array(kept, dtype=positions.dtype)
+    return positions
+
+
+### Tests begin here
+
+multiline_dummy_bytes = b'it\ts\nme\tlo\nuis\t:)\nhel\t"lo\nwor\tld"\naga\tin...!\n'
+
+
+@mark.parametrize("n_cols", [3])
+@mark.parametrize(
+    "rows_bytes,expected",
+    [
+        (
+            b'1,2,hello\n3,4,world\n5,6,"foo\n7,8,bar\n9,10,baz"\n',
+            ValidationResult(3, 47),
+        ),
+        (
+            b'1,2,hello\n3,4,world\n5,6,"foo\n7,8,bar\n9,10,baz"\n5,6,"foo\n',
+            ValidationResult(3, 47, 47, "open_quote"),
+        ),
+        (
+            b'\n1,2,hello\n3,4,world\n5,6,"foo\n7,8,bar\n9,10,baz"\n5,6,"foo'[::-1],
+            ValidationResult(0, 0, 0, "quotechar"),
+        ),
+        (
+            b'hello,world,etc\nfoo"\netc,etc,etc\n',
+            ValidationResult(1, 16, 16, "quotechar"),
+        ),
+        (
+            b"hello,new,world\nfoo,bar\netc,etc,etc\n",
+            ValidationResult(1, 16, 16, "absent_field"),
+        ),
+        (
+            b"hello,new,world\nfoo,bar,baz,qux\n",
+            ValidationResult(1, 16, 16, "excess_field"),
+        ),
+        (
+            b'1,2,"a \\""quoted\\"" word"\n3,4,"x"y\n',
+            ValidationResult(1, 26, 26, "quotechar"),
+        ),
+        (b'1,2,"a ""quoted"" word"\n', ValidationResult(0, 0, 0, "quotechar")),
+        (b'1,2,"a\\"\n3,4,x\\"y\n', ValidationResult(2, 18)),
+        (b'1,2,"no trailing newline"', ValidationResult(1, 25)),
+    ],
+)
+def test_validate_bytes(n_cols, rows_bytes, expected):
+    """
+    Show the same verdicts are reached as by the DataFrame-based validators, with the
+    offset of the first invalid row given in place of the row itself: a quotechar left
+    in a field value (a doubled one, or a stray one) is invalid unless it comes just
+    after the escapechar, which escapes nothing else (so a quotechar after it may still
+    close a quoted field).
+    """
+    assert validate_bytes(rows_bytes, n_cols) == expected
+
+
+def test_validate_bytes_agrees():
+    """
+    Show that random blocks (of well and badly quoted fields, with escaped, doubled and
+    stray quotechars, and of too few and too many fields) are found valid or invalid by
+    :func:`validate_bytes` as by :func:`validate_str`, with as many rows before the first
+    invalid row. (The kind of error may differ in a row with several.)
+    """
+    schema = CsvSchema.from_head(b"intA,intB,strC\n")
+    fields = ["1", "", '"a\nb"', 'b"', '"c""d"', 'a\\"b', '"a\\"b"', '"a\\"', '"e,f"', '"""g"""']
+    fields += ['"h\\"""', '""', '"q"x']
+    rng = random.Random(0)
+    for _ in range(500):
+        rows_str = "".join(
+            ",".join(rng.choices(fields, k=rng.choice([2, 3, 3, 4]))) + "\n"
+            for _ in range(rng.randint(1, 3))
+        )
+        result = validate_bytes(rows_str.encode(), schema.n_cols)
+        expected = validate_str(rows_str, return_rows=False, schema=schema)
+        assert result.valid == expected.valid, rows_str
+        if expected.error_pos is not None:
+            assert result.n_rows == expected.n_rows, rows_str
+
+
+@mark.parametrize("n_cols", [2])
+@mark.parametrize(
+    "start,end,expected",
+    [
+        (0, 11, ValidationResult(2, 11)),
+        (11, 34, ValidationResult(2, 23)),
+        (34, 45, ValidationResult(1, 11)),
+        (18, 26, ValidationResult(0, 0, 18, "open_quote")),
+        (26, 34, ValidationResult(0, 0, 26, "quotechar")),
+    ],
+)
+def test_validate_memoryview_range(n_cols, start, end, expected):
+    """
+    Show that byte ranges of a TSV with a multiline field can be validated in place on a
+    :class:`memoryview`, and that the ranges which split the multiline field are invalid.
+    """
+    buf = memoryview(multiline_dummy_bytes)
+    result = validate_bytes(buf, n_cols, delimiter=b"\t", start=start, end=end)
+    assert result == expected
+
+
+@mark.parametrize("n_cols", [2])
+@mark.parametrize(
+    "start,end,final,expected",
+    [
+        (11, 26, True, ValidationResult(1, 7, 18, "open_quote")),
+        (11, 26, False, ValidationResult(1, 7)),
+        (26, 45, False, ValidationResult(0, 0, 26, "quotechar")),
+    ],
+)
+def test_validate_window(n_cols, start, end, final, expected):
+    """
+    Show that a window cut inside a multiline field is only invalid if it is ``final``
+    (if not, the bytes after the last complete row are left unvalidated), but a window
+    starting inside one is invalid either way.
+    """
+    buf = memoryview(multiline_dummy_bytes)
+    result = validate_bytes(buf, n_cols, b"\t", start=start, end=end, final=final)
+    assert result == expected
+
+
+@mark.parametrize("n_cols", [3])
+@mark.parametrize("lineterminator", [b"~", b"\x1e", b"\r\n", b"<EOR>"])
+def test_validate_lineterminator(n_cols, lineterminator):
+    """
+    Show that rows can be validated with any lineterminator of one or more bytes, even
+    if it also appears within a quoted field.
+    """
+    rows = [b"a,b,c", b'1,"2' + lineterminator + b'",3', b"4,5,6"]
+    rows_bytes = lineterminator.join(rows)
+    result = validate_bytes(rows_bytes, n_cols, lineterminator=lineterminator)
+    assert result == ValidationResult(3, len(rows_bytes))
+    short_row_pos = len(rows_bytes) + len(lineterminator)
+    result = validate_bytes(
+        rows_bytes + lineterminator + b"7,8", n_cols, lineterminator=lineterminator
+    )
+    assert result == ValidationResult(3, short_row_pos, short_row_pos, "absent_field")
+
+
+trap_str = "\u2c41\u0100\u2c41"  # Has a comma byte straddling two UTF-16 code units
+unquoted_rows_str = f"1,2,{trap_str}\n" * 300
+
+
+@mark.parametrize("encoding", ["utf-8", "utf-16-le", "utf-16-be", "utf-32-le"])
+@mark.parametrize("n_cols", [3])
+@mark.parametrize(
+    "rows_str,valid_str,n_rows,kind",
+    [
+        (f'1,2,h€llo\n3,4,"w{trap_str}\nrld"\n', f'1,2,h€llo\n3,4,"w{trap_str}\nrld"\n', 2, None),
+        (f'1,2,{trap_str}\n3,4,wö"rld\n', f"1,2,{trap_str}\n", 1, "quotechar"),
+        (f"1,2,{trap_str}\n3,{trap_str}\n", f"1,2,{trap_str}\n", 1, "absent_field"),
+        (unquoted_rows_str, unquoted_rows_str, 300, None),
+        (unquoted_rows_str + "1,2,3,4\n", unquoted_rows_str, 300, "excess_field"),
+    ],
+)
+def test_validate_encoded(n_cols, rows_str, valid_str, n_rows, kind, encoding):
+    """
+    Show that multibyte text is validated without decoding it, with byte offsets in the
+    result, and that the widened tokens of UTF-16 and UTF-32 are only matched at code
+    unit boundaries (including when many rows without quotes are checked at once).
+    """
+    rows_bytes = rows_str.encode(encoding)
+    n_bytes = len(valid_str.encode(encoding))
+    error_pos = None if kind is None else n_bytes
+    result = validate_bytes(rows_bytes, n_cols, **Dialect().byte_kwargs(encoding))
+    assert result == ValidationResult(n_rows, n_bytes, error_pos, kind)
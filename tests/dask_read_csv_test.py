@@ -0,0 +1,197 @@
+from __future__ import annotations
+import io
+import pandas as pd
+import pytest
+from pytest import fixture, mark, raises
+
+from byte_validation_test import validate_bytes
+from dialect_test import Dialect
+from row_index_test import partition_store, row_index
+from schema_test import CsvSchema, schema_for_url
+
+dask = pytest.importorskip("dask")
+dd = pytest.importorskip("dask.dataframe")
+
+__all__ = [
+    "read_csv_validated",
+    "read_validated_partition",
+    "partition_meta",
+    "parse_kwargs",
+    "column_dtypes",
+]
+
+
+def column_dtypes(schema: CsvSchema) -> dict[str, object]:
+    "The dtype of each column of the ``schema``: its dtype hint, or else strings."
+    hints = schema.dtypes + (None,) * (schema.n_cols - len(schema.dtypes))
+    return {name: dtype or object for name, dtype in zip(schema.names, hints)}
+
+
+def parse_kwargs(schema: CsvSchema, encoding="utf-8") -> dict[str, object]:
+    """
+    The arguments to :function:`pandas.read_csv` to parse a (headerless) partition of a
+    CSV with the ``schema`` by the C engine: the columns with a dtype hint are cast to it
+    (datetimes are parsed as dates), and the others are read as strings. The escapechar
+    is not passed, as it is not when validating (see :class:`Dialect`).
+    """
+    dialect = schema.dialect
+    dtypes = column_dtypes(schema)
+    date_cols = [
+        name for name, dtype in dtypes.items() if pd.api.types.pandas_dtype(dtype).kind == "M"
+    ]
+    kwargs = dict(
+        names=list(schema.names),
+        header=None,
+        sep=dialect.delimiter,
+        quotechar=dialect.quotechar,
+        doublequote=dialect.doublequote,
+        dtype={name: dtype for name, dtype in dtypes.items() if name not in date_cols},
+        parse_dates=date_cols,
+        encoding=encoding,
+        engine="c",
+    )
+    if len(dialect.lineterminator) == 1 and dialect.lineterminator != "\n":
+        kwargs["lineterminator"] = dialect.lineterminator  # The C engine splits "\r\n" itself
+    return kwargs
+
+
+def partition_meta(schema: CsvSchema) -> pd.DataFrame:
+    "An empty DataFrame with the columns and dtypes of every partition of the CSV."
+    return pd.DataFrame(
+        {name: pd.Series(dtype=dtype) for name, dtype in column_dtypes(schema).items()}
+    )
+
+
+def read_validated_partition(
+    url: str, start: int, length: int, schema: CsvSchema, encoding="utf-8"
+) -> pd.DataFrame:
+    """
+    Read the byte range of a single partition of the file at ``url``, validate it with
+    :func:`validate_bytes` (which parses no values), then parse it once with the C
+    engine, raising a :class:`ValueError` at the first invalid row rather than parsing a
+    partition which does not split cleanly into rows.
+    """
+    with open(url, "rb") as f:
+        f.seek(start)
+        data = f.read(length)
+    result = validate_bytes(data, schema.n_cols, **schema.dialect.byte_kwargs(encoding))
+    if not result.valid:
+        row_offset = start + result.error_pos
+        raise ValueError(f"Invalid row ({result.error_kind}) at {row_offset=} of {url}")
+    return pd.read_csv(io.BytesIO(data), nrows=result.n_rows, **parse_kwargs(schema, encoding))
+
+
+def read_csv_validated(
+    url: str,
+    blocksize: int = 2**26,
+    schema: CsvSchema | None = None,
+    dialect: Dialect = Dialect(),
+    encoding="utf-8",
+    header=True,
+):
+    """
+    Read the CSV at ``url`` into a dask DataFrame of one partition per block of the
+    partitions ``store``, whose boundaries are row starts found by the quote-aware
+    :func:`row_index` of the file (so a multiline field is never split). Each task of
+    the graph reads only its own byte range, and validates it before parsing it once
+    (see :func:`read_validated_partition`), so the graph may be run by the local
+    threaded or process schedulers as well as a distributed one.
+
+    Args:
+      schema : The :class:`CsvSchema` of the file (default: inferred from its head by
+               :func:`schema_for_url`, in the ``dialect``)
+      header : Whether the file begins with a header row (not read as a row of data)
+    """
+    if schema is None:
+        schema = schema_for_url(url, dialect, encoding)
+    row_starts = row_index(url, schema.dialect, encoding)
+    if header:
+        row_starts = row_starts[1:]
+    with open(url, "rb") as f:
+        size = f.seek(0, 2)
+    store = partition_store(row_starts, size, blocksize)
+    meta = partition_meta(schema)
+    if not store:
+        return dd.from_pandas(meta, npartitions=1)
+    read_partition = dask.delayed(read_validated_partition, pure=True)
+    parts = [
+        read_partition(url, start, length, schema, encoding)
+        for _, start, length in store.values()
+    ]
+    return dd.from_delayed(parts, meta=meta)
+
+
+### Tests begin here
+
+multiline_dummy_bytes = b'it\ts\nme\tlo\nuis\t:)\nhel\t"lo\nwor\tld"\naga\tin...!\n'
+typed_dummy_bytes = (
+    b'id\tword\tday\n1\thello\t2021-09-01\n2\t"wor\nld"\t2021-09-02\n3\t:)\t2021-09-03\n'
+)
+tsv_dialect = Dialect(delimiter="\t")
+
+
+@fixture
+def dummy_path(tmp_path):
+    return tmp_path / "my_dummy_file.tsv"
+
+
+@mark.parametrize("scheduler", ["sync", "threads", "processes"])
+@mark.parametrize("blocksize,n_partitions", [(5, 4), (10, 3), (20, 2), (1000, 1)])
+def test_read_csv_validated(dummy_path, blocksize, n_partitions, scheduler):
+    """
+    Show that the file is read by each of the local schedulers as pandas reads it whole,
+    from partitions which never split the multiline field.
+    """
+    dummy_path.write_bytes(multiline_dummy_bytes)
+    ddf = read_csv_validated(str(dummy_path), blocksize, dialect=tsv_dialect)
+    assert ddf.npartitions == n_partitions
+    expected = pd.read_csv(dummy_path, sep="\t", dtype=object)
+    df = ddf.compute(scheduler=scheduler).reset_index(drop=True)
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_read_csv_typed(dummy_path):
+    """
+    Show that the columns with dtype hints in the schema are cast to them (datetimes
+    included), and the others read as strings, matching the meta of the graph.
+    """
+    dummy_path.write_bytes(typed_dummy_bytes)
+    hints = {"id": "int64", "day": "datetime64[ns]"}
+    schema = CsvSchema.from_head(typed_dummy_bytes, tsv_dialect, dtypes=hints)
+    ddf = read_csv_validated(str(dummy_path), 20, schema)
+    df = ddf.compute(scheduler="sync")
+    assert df.dtypes.to_dict() == ddf.dtypes.to_dict()
+    assert df["id"].tolist() == [1, 2, 3]
+    assert df["word"].tolist() == ["hello", "wor\nld", ":)"]
+    assert df["day"].dt.day.tolist() == [1, 2, 3]
+
+
+def test_read_csv_invalid(dummy_path):
+    """
+    Show that a partition with an invalid row raises an error when computed (giving the
+    offset of the row in the file), not when the graph is built.
+    """
+    dummy_path.write_bytes(b"a\tb\nfoo\tbar\nba\"z\tqux\n")
+    ddf = read_csv_validated(str(dummy_path), 8, dialect=tsv_dialect)
+    with raises(ValueError, match="Invalid row \\(quotechar\\) at row_offset=12"):
+        ddf.compute(scheduler="sync")
+
+
+def test_read_csv_header_only(dummy_path):
+    """
+    Show that a file of only a header row is read as an empty DataFrame of its columns.
+    """
+    dummy_path.write_bytes(b"it\ts\n")
+    df = read_csv_validated(str(dummy_path), 10, dialect=tsv_dialect).compute()
+    assert list(df.columns) == ["it", "s"]
+    assert len(df) == 0
+
+
+def test_read_csv_escapechar(dummy_path):
+    """
+    Show that the rows are parsed as they were validated: the escapechar only excuses a
+    quotechar within an unquoted field, and does not stop a quotechar closing a field.
+    """
+    dummy_path.write_bytes(b'a,b\n1,"x\\"\n2,y\\"z\n')
+    df = read_csv_validated(str(dummy_path), 10).compute(scheduler="sync")
+    assert df.to_dict("list") == {"a": ["1", "2"], "b": ["x\\", 'y\\"z']}
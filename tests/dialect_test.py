@@ -0,0 +1,149 @@
+from __future__ import annotations
+import codecs
+from dataclasses import dataclass
+from functools import lru_cache
+import re
+import sys
+from pytest import mark, raises
+
+__all__ = ["Dialect", "compile_quote_patt", "code_unit", "encode_token"]
+
+single_byte_codecs = ("ascii", "utf-8", "utf-8-sig", "iso8859-", "cp125", "latin", "mac-")
+
+
+@lru_cache(maxsize=32)
+def compile_quote_patt(quotechar: str, escapechar: str | None) -> re.Pattern:
+    """
+    Compile a regex to find an unescaped ``quotechar`` with :meth:`re.Pattern.search`.
+    The pattern is a single character (with a one character lookbehind) so the search is
+    linear in the length of the field value, with no backtracking.
+    """
+    lookbehind = "" if escapechar is None else f"(?<!{re.escape(escapechar)})"
+    return re.compile(lookbehind + re.escape(quotechar))
+
+
+@lru_cache(maxsize=32)
+def code_unit(encoding: str) -> int:
+    """
+    The width (in bytes) of the code units of ``encoding``, in which the dialect's
+    (ASCII) tokens are found byte-wise: 1 for UTF-8 and the single byte encodings (such
+    as Latin-1), whose multibyte characters never contain an ASCII byte, or 2 and 4 for
+    UTF-16 and UTF-32, whose tokens are only matched at multiples of the code unit.
+    Any other encoding (e.g. Shift JIS, in which a multibyte character may end in the
+    byte of a backslash) raises a :class:`ValueError`.
+    """
+    name = codecs.lookup(encoding).name
+    if name.startswith("utf-16"):
+        return 2
+    if name.startswith("utf-32"):
+        return 4
+    if name.startswith(single_byte_codecs):
+        return 1
+    raise ValueError(f"Cannot find the tokens of {encoding=} without decoding")
+
+
+def encode_token(token: str, encoding: str) -> bytes:
+    """
+    Encode a token of the dialect as it appears within the encoded CSV, without the byte
+    order mark which a codec such as ``"utf-16"`` puts at the start of its output (so
+    the tokens of ``"utf-16"`` are those of the platform's byte order, as it is written).
+    """
+    return token.encode(encoding)[len("".encode(encoding)) :]
+
+
+@dataclass(frozen=True)
+class Dialect:
+    """
+    The CSV dialect arguments to validate with, the same as those passed to
+    :function:`pandas.read_csv` (``sep`` is named ``delimiter`` as in the csv module).
+    Instances are hashable, and share the compiled quotechar pattern of any other
+    instance with the same ``quotechar`` and ``escapechar``.
+
+    The ``escapechar`` is never passed to a parser, and escapes nothing: a quotechar
+    after it still opens or closes a quoted field, and it is left in the field value.
+    It only excuses a quotechar left in a field value just after it, which would
+    otherwise be reported. With ``escapechar=None`` every such quotechar is reported.
+    """
+
+    delimiter: str = ","
+    quotechar: str = '"'
+    escapechar: str | None = "\\"
+    doublequote: bool = True
+    lineterminator: str = "\n"
+
+    @property
+    def quote_patt(self) -> re.Pattern:
+        "The compiled regex to find an unescaped quotechar (see :func:`compile_quote_patt`)."
+        return compile_quote_patt(self.quotechar, self.escapechar)
+
+    def byte_kwargs(self, encoding="utf-8") -> dict:
+        """
+        The dialect as the encoded keyword arguments of :func:`validate_bytes` (with the
+        width of the code units, see :func:`code_unit`).
+        """
+        escapechar = self.escapechar
+        return {
+            "delimiter": encode_token(self.delimiter, encoding),
+            "quotechar": encode_token(self.quotechar, encoding),
+            "escapechar": None if escapechar is None else encode_token(escapechar, encoding),
+            "doublequote": self.doublequote,
+            "lineterminator": encode_token(self.lineterminator, encoding),
+            "unit": code_unit(encoding),
+        }
+
+
+### Tests begin here
+
+
+@mark.parametrize(
+    "dialect,value,expected",
+    [
+        (Dialect(), 'ba"z', True),
+        (Dialect(), 'ba\\"z', False),
+        (Dialect(), 'foo\n7,8,bar"', True),
+        (Dialect(escapechar=None), 'ba\\"z', True),
+        (Dialect(quotechar="'"), 'ba"z', False),
+    ],
+)
+def test_quote_patt(dialect, value, expected):
+    """
+    Show that only unescaped quotechars are found, including on any line of a multiline
+    field value (not just the first).
+    """
+    assert (dialect.quote_patt.search(value) is not None) == expected
+
+
+def test_quote_patt_cached():
+    """
+    Show that the compiled pattern is shared between equal dialects.
+    """
+    assert Dialect().quote_patt is Dialect(delimiter="\t").quote_patt
+    assert Dialect().quote_patt is not Dialect(quotechar="'").quote_patt
+
+
+@mark.parametrize(
+    "encoding,unit,expected",
+    [
+        ("utf-8", 1, b"\r\n"),
+        ("latin-1", 1, b"\r\n"),
+        ("utf-16-le", 2, b"\r\x00\n\x00"),
+        ("utf-16-be", 2, b"\x00\r\x00\n"),
+        ("utf-32-le", 4, b"\r\x00\x00\x00\n\x00\x00\x00"),
+    ],
+)
+def test_encode_token(encoding, unit, expected):
+    """
+    Show that tokens are widened to the code unit of the encoding, without a BOM.
+    """
+    assert encode_token("\r\n", encoding) == expected
+    assert code_unit(encoding) == unit
+    native = "utf-16-le" if sys.byteorder == "little" else "utf-16-be"
+    assert encode_token("\r\n", "utf-16") == encode_token("\r\n", native)
+
+
+def test_unsupported_encoding():
+    """
+    Show that an encoding whose multibyte characters may contain a token byte is refused.
+    """
+    with raises(ValueError):
+        code_unit("shift_jis")
@@ -0,0 +1,186 @@
+from __future__ import annotations
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+from typing import Callable, Iterator
+from pytest import mark
+
+__all__ = ["Collector", "collect", "current_collector", "instrument", "count", "reject"]
+
+current_collector: ContextVar[Collector | None] = ContextVar("current_collector", default=None)
+
+
+class Collector:
+    """
+    Totals of the instrumented stages of the validation pipeline, recorded while the
+    collector is current (see :func:`collect`).
+
+    Attributes:
+      stages     : The number of calls, wall time (in seconds), bytes and rows of each
+                   stage, as ``{stage: [calls, seconds, n_bytes, n_rows]}``
+      events     : Counts of events within the stages (such as regex evaluations)
+      rejections : Counts of the reasons candidate partition boundaries were rejected
+    """
+
+    __slots__ = ("stages", "events", "rejections")
+
+    def __init__(self):
+        self.stages = {}
+        self.events = {}
+        self.rejections = {}
+
+    def record(self, stage: str, seconds: float, n_bytes: int = 0, n_rows: int = 0) -> None:
+        totals = self.stages.setdefault(stage, [0, 0.0, 0, 0])
+        totals[0] += 1
+        totals[1] += seconds
+        totals[2] += n_bytes
+        totals[3] += n_rows
+
+    def count(self, event: str, n: int = 1) -> None:
+        self.events[event] = self.events.get(event, 0) + n
+
+    def reject(self, reason: str) -> None:
+        self.rejections[reason] = self.rejections.get(reason, 0) + 1
+
+    def totals(self) -> dict[str, dict]:
+        "The totals as a dict (of plain values, so it may be serialised as JSON)."
+        stage_keys = ("calls", "seconds", "bytes", "rows")
+        return {
+            "stages": {
+                stage: dict(zip(stage_keys, totals)) for stage, totals in self.stages.items()
+            },
+            "events": dict(self.events),
+            "rejections": dict(self.rejections),
+        }
+
+    def to_openmetrics(self, prefix: str = "csv_validation") -> str:
+        "The totals as counters in the OpenMetrics text format."
+        lines = []
+        stage_metrics = ("calls", "seconds", "bytes", "rows")
+        for i, metric in enumerate(stage_metrics):
+            lines.append(f"# TYPE {prefix}_stage_{metric} counter")
+            for stage, totals in self.stages.items():
+                lines.append(f'{prefix}_stage_{metric}_total{{stage="{stage}"}} {totals[i]}')
+        for family, label, values in [
+            ("events", "event", self.events),
+            ("rejected_boundaries", "reason", self.rejections),
+        ]:
+            lines.append(f"# TYPE {prefix}_{family} counter")
+            for name, value in values.items():
+                lines.append(f'{prefix}_{family}_total{{{label}="{name}"}} {value}')
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def collect(collector: Collector | None = None) -> Iterator[Collector]:
+    """
+    Make a collector (a new one unless given) current for the duration of the block,
+    so that the instrumented stages run within it (including in any asyncio tasks or
+    :func:`asyncio.to_thread` threads started in it, which copy the context) record
+    their totals on it.
+    """
+    collector = Collector() if collector is None else collector
+    token = current_collector.set(collector)
+    try:
+        yield collector
+    finally:
+        current_collector.reset(token)
+
+
+def instrument(stage: str, measure: Callable[..., tuple[int, int]] | None = None):
+    """
+    Decorate a function as a stage of the pipeline, recording its calls and wall time on
+    the current collector. When there is no current collector this costs one context
+    variable lookup per call.
+
+    Args:
+      measure : A function of the return value and the arguments of the decorated
+                function, giving the number of bytes and rows it processed
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            collector = current_collector.get()
+            if collector is None:
+                return func(*args, **kwargs)
+            start = perf_counter()
+            result = func(*args, **kwargs)
+            seconds = perf_counter() - start
+            n_bytes, n_rows = (0, 0) if measure is None else measure(result, *args, **kwargs)
+            collector.record(stage, seconds, n_bytes, n_rows)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def count(event: str, n: int = 1) -> None:
+    "Count ``n`` events on the current collector, if there is one."
+    collector = current_collector.get()
+    if collector is not None:
+        collector.count(event, n)
+
+
+def reject(reason: str) -> None:
+    "Count a rejected boundary on the current collector, if there is one."
+    collector = current_collector.get()
+    if collector is not None:
+        collector.reject(reason)
+
+
+### Tests begin here
+
+
+@instrument("dummy", measure=lambda result, data: (len(data), result))
+def count_lines(data: bytes) -> int:
+    count("dummy_calls")
+    return data.count(b"\n")
+
+
+def test_collect_totals():
+    """
+    Show that only the calls made while a collector is current are recorded, and that
+    nested collectors are separate.
+    """
+    count_lines(b"a\nb\n")
+    with collect() as outer:
+        count_lines(b"a\nb\n")
+        with collect() as inner:
+            count_lines(b"c\n")
+            reject("forward_quotechar")
+        count_lines(b"d\ne\nf\n")
+    count_lines(b"a\nb\n")
+    assert outer.stages["dummy"][::2] == [2, 10]
+    assert outer.stages["dummy"][3] == 5
+    assert outer.events == {"dummy_calls": 2}
+    assert outer.rejections == {}
+    assert inner.totals()["stages"]["dummy"]["rows"] == 1
+    assert inner.totals()["rejections"] == {"forward_quotechar": 1}
+
+
+@mark.parametrize(
+    "expected_line",
+    [
+        "# TYPE csv_validation_stage_calls counter",
+        'csv_validation_stage_calls_total{stage="dummy"} 1',
+        'csv_validation_stage_bytes_total{stage="dummy"} 4',
+        'csv_validation_stage_rows_total{stage="dummy"} 2',
+        'csv_validation_events_total{event="dummy_calls"} 1',
+        'csv_validation_rejected_boundaries_total{reason="backward_open_quote"} 1',
+        "# EOF",
+    ],
+)
+def test_openmetrics(expected_line):
+    """
+    Show that the totals are dumped as OpenMetrics counters, ending with ``# EOF``.
+    """
+    with collect() as collector:
+        count_lines(b"a\nb\n")
+        reject("backward_open_quote")
+    dump = collector.to_openmetrics()
+    assert expected_line in dump.splitlines()
+    assert dump.endswith("# EOF\n")
@@ -3,6 +3,9 @@ import io
 import pandas as pd
 from pytest import mark
 
+from byte_validation_test import validate_bytes
+from validation_result_test import ValidationResult
+
 
 @mark.parametrize(
     "sample_str,sep,linesep,expected",
@@ -68,3 +71,20 @@ def test_implicit_lineterm_support(sample_str, sep, linesep, expected):
     """
     df = pd.read_csv(io.StringIO(sample_str), sep=sep, lineterminator=linesep)
     assert df.values.ravel().tolist() == expected
+
+
+@mark.parametrize(
+    "sample_bytes,sep,linesep,expected",
+    [
+        (b"a b c~1 2 3~4 5 6~7 8 9", b" ", b"~", ValidationResult(4, 23)),
+        (b"a b c\x1e1 2 3\x1e4 5 6\x1e", b" ", b"\x1e", ValidationResult(3, 18)),
+        (b"a b c\r\n1 2 3\r\n4 5\r\n", b" ", b"\r\n", ValidationResult(2, 14, 14, "absent_field")),
+    ],
+)
+def test_byte_lineterm_support(sample_bytes, sep, linesep, expected):
+    """
+    Show that :func:`validate_bytes` splits rows on a non-standard lineterminator (a
+    tilde, a record separator, or the two bytes of CRLF) as pandas does.
+    """
+    result = validate_bytes(sample_bytes, 3, delimiter=sep, lineterminator=linesep)
+    assert result == expected
@@ -0,0 +1,112 @@
+from __future__ import annotations
+import mmap
+from pytest import fixture, mark
+
+from byte_validation_test import validate_bytes
+from dialect_test import Dialect
+from schema_test import CsvSchema
+
+__all__ = ["validate_mapped"]
+
+
+def validate_mapped(
+    path,
+    blocks: list[tuple[int, int]],
+    n_cols: int | None = None,
+    delimiter=b",",
+    quotechar=b'"',
+    escapechar=b"\\",
+    doublequote=True,
+    lineterminator=b"\n",
+    encoding="utf-8",
+    schema: CsvSchema | None = None,
+) -> list[None | str]:
+    """
+    Validate the byte ranges ``blocks`` of the file at ``path`` in place on a read-only
+    memory map of the file, so no block is read into memory, decoded or copied before
+    being validated by :func:`validate_bytes`. Only the first line of an invalid row is
+    ever decoded (to report it).
+
+    Args:
+      blocks : The ``(start, length)`` byte ranges to validate (as in the values of the
+               partitions ``store``)
+      schema : A :class:`CsvSchema` giving the number of columns and the dialect (in
+               place of ``n_cols`` and the byte dialect arguments)
+
+    Returns:
+      A verdict per block: ``None`` if valid, otherwise a message giving the offset and
+      first line of the first invalid row.
+    """
+    byte_kwargs = dict(
+        delimiter=delimiter,
+        quotechar=quotechar,
+        escapechar=escapechar,
+        doublequote=doublequote,
+        lineterminator=lineterminator,
+    )
+    if schema is not None:
+        n_cols, byte_kwargs = schema.n_cols, schema.dialect.byte_kwargs(encoding)
+    verdicts = []
+    with open(path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            return [None] * len(blocks)  # An empty file cannot be memory mapped
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, "madvise"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            for start, length in blocks:
+                end = start + length
+                result = validate_bytes(mm, n_cols, start=start, end=end, **byte_kwargs)
+                if result.valid:
+                    verdicts.append(None)
+                    continue
+                row_offset = result.error_pos
+                line_end = mm.find(byte_kwargs["lineterminator"], row_offset, end)
+                line = mm[row_offset : end if line_end == -1 else line_end]
+                verdicts.append(f"Invalid row at {row_offset=}: {line.decode(encoding)!r}")
+    return verdicts
+
+
+### Tests begin here
+
+multiline_dummy_bytes = b'it\ts\nme\tlo\nuis\t:)\nhel\t"lo\nwor\tld"\naga\tin...!\n'
+
+
+@fixture
+def dummy_path(tmp_path):
+    file_path = tmp_path / "my_dummy_file.tsv"
+    file_path.write_bytes(multiline_dummy_bytes)
+    return file_path
+
+
+@mark.parametrize(
+    "blocks,expected",
+    [
+        ([(0, 11), (11, 23), (34, 11)], [None, None, None]),
+        ([(0, 34), (34, 11)], [None, None]),
+        (
+            [(0, 26), (26, 19)],
+            [
+                "Invalid row at row_offset=18: 'hel\\t\"lo'",
+                "Invalid row at row_offset=26: 'wor\\tld\"'",
+            ],
+        ),
+    ],
+)
+def test_validate_mapped(dummy_path, blocks, expected):
+    """
+    Show that the partitions of ``offsets-calc-multiline-field.py`` are valid when read
+    from a memory map, while splitting at the non-row-terminating offset 26 is not
+    (whether the dialect is given directly or by a schema).
+    """
+    assert validate_mapped(dummy_path, blocks, n_cols=2, delimiter=b"\t") == expected
+    schema = CsvSchema.from_head(multiline_dummy_bytes, Dialect(delimiter="\t"))
+    assert validate_mapped(dummy_path, blocks, schema=schema) == expected
+
+
+def test_validate_mapped_empty(tmp_path):
+    """
+    Show that an empty file (which cannot be memory mapped) has only valid empty blocks.
+    """
+    file_path = tmp_path / "empty.tsv"
+    file_path.write_bytes(b"")
+    assert validate_mapped(file_path, [(0, 0)], n_cols=2) == [None]
@@ -1,78 +1,807 @@
 # From https://github.com/lmmx/csv-validation-sandbox/issues/1#issuecomment-912498007
 from __future__ import annotations
+from contextlib import contextmanager
+from itertools import islice
+from typing import Iterator
+import csv
 import io
+import numpy as np
 import pandas as pd
-from pytest import mark, raises
+from pandas.errors import ParserError, ParserWarning
+from pytest import importorskip, mark, raises
+import random
 import re
+import warnings
 
-__all__ = ["validate_df", "validate_str", "trivial_return", "make_df"]
+from dialect_test import Dialect
+from instrumentation_test import collect, count, instrument
+from schema_test import CsvSchema
+from validation_result_test import ValidationResult
 
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+__all__ = [
+    "quotechar_mask",
+    "cast_column",
+    "cast_columns",
+    "error_masks",
+    "first_errors",
+    "typed_frame",
+    "frame_output",
+    "validate_df",
+    "validate_str",
+    "validate_many",
+    "iter_validate",
+    "trivial_return",
+    "field_counts",
+    "iter_field_counts",
+    "make_df",
+    "read_python_df",
+    "iter_df_chunks",
+    "iter_python_chunks",
+    "read_csv_kwargs",
+    "csv_rows",
+    "check_field_counts",
+    "set_absent_fields",
+]
+
+
+def quotechar_mask(df: pd.DataFrame, re_patt: re.Pattern) -> np.ndarray:
+    """
+    Search for the compiled quotechar pattern ``re_patt`` in every string field of the
+    DataFrame one column at a time (only the ``object`` dtype columns can hold strings),
+    giving a boolean mask with one value per row, true if any field in the row matched.
+    """
+    mask = np.zeros(len(df), dtype=bool)
+    for col_name in df.select_dtypes(include="object").columns:
+        try:
+            col_matched = df[col_name].str.contains(re_patt, na=False)
+        except AttributeError:
+            continue  # An object column with no string values cannot contain quotechars
+        count("regex_evaluations", len(df))
+        mask |= col_matched.to_numpy(dtype=bool)
+    return mask
+
+
+def cast_column(values: pd.Series, dtype) -> tuple[pd.Series, np.ndarray]:
+    """
+    Cast a whole column of (unconverted) string values to the hinted ``dtype`` at once,
+    giving the cast values (not yet converted to the ``dtype`` itself, see
+    :func:`typed_frame`) and a boolean mask which is true for each value that cannot be
+    cast: numbers are cast with :func:`pd.to_numeric` (and integers must be whole,
+    unsigned integers not negative), datetimes with :func:`pd.to_datetime`, and booleans
+    must be spelt as pandas reads them. Absent fields (``None``) are never a mismatch
+    (see :func:`validate_df`), nor are empty fields if the ``dtype`` is nullable (a
+    pandas extension dtype such as ``"Int64"``). Other dtypes (such as strings) are not
+    checked, and their values are returned as they are.
+    """
+    dtype = pd.api.types.pandas_dtype(dtype)
+    kind = dtype.kind
+    if kind in "iuf":
+        cast = pd.to_numeric(values, errors="coerce")
+        mismatched = cast.isna()
+        if kind in "iu":
+            mismatched |= cast % 1 != 0
+        if kind == "u":
+            mismatched |= cast < 0
+    elif kind == "M":
+        cast = pd.to_datetime(values, errors="coerce")
+        mismatched = cast.isna()
+    elif kind == "b":
+        mismatched = ~values.isin(["True", "False", "true", "false", "TRUE", "FALSE"])
+        cast = values.isin(["True", "true", "TRUE"]).mask(values == "")
+    else:
+        return values, np.zeros(len(values), dtype=bool)
+    mismatched &= values.notna()
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        mismatched &= values != ""
+    return cast, mismatched.to_numpy(dtype=bool)
+
+
+def cast_columns(
+    df: pd.DataFrame, schema: CsvSchema
+) -> tuple[dict[str, pd.Series], dict[str, np.ndarray]]:
+    """
+    Cast each column of the DataFrame which has a dtype hint in the ``schema`` with
+    :func:`cast_column`, giving the cast values and the mismatch mask of each column
+    checked by name.
+    """
+    casts, masks = {}, {}
+    for col_name, dtype in schema.dtype_map().items():
+        if col_name in df.columns:
+            casts[col_name], masks[col_name] = cast_column(df[col_name], dtype)
+    return casts, masks
+
+
+def typed_frame(df: pd.DataFrame, casts: dict[str, pd.Series], schema: CsvSchema | None):
+    """
+    The validated DataFrame with each column that has a dtype hint in the ``schema``
+    replaced by its values as cast when they were checked (by :func:`cast_columns`),
+    converted to the hinted dtype, so that the columns are never parsed a second time.
+    The other columns (of strings) are shared with ``df`` rather than copied.
+    """
+    if not casts:
+        return df
+    dtypes = schema.dtype_map()
+    typed = df.copy(deep=False)
+    for col_name, cast in casts.items():
+        typed[col_name] = cast.astype(dtypes[col_name])
+    return typed
+
+
+def frame_output(df: pd.DataFrame, return_frame: bool | str):
+    """
+    The validated (typed) DataFrame as requested by ``return_frame``: as it is if
+    ``True`` or ``"pandas"``, or as a :class:`pyarrow.Table` if ``"arrow"`` (converted
+    without copying the numeric columns where pyarrow can).
+    """
+    if return_frame == "arrow":
+        if pa is None:
+            raise ImportError("pyarrow is required to return an Arrow table")
+        return pa.Table.from_pandas(df, preserve_index=False)
+    return df
+
+
+def error_masks(
+    df: pd.DataFrame, dialect: Dialect = Dialect(), schema: CsvSchema | None = None
+) -> tuple[np.ndarray, np.ndarray, dict[str, np.ndarray], dict[str, pd.Series]]:
+    """
+    The column-wise checks of :func:`validate_df`, as masks with one bool per row: of
+    the rows with an absent field, the rows with a quotechar in a field, and (by column
+    name) the rows with a value not castable to the column's dtype hint in the ``schema``,
+    followed by the values of those columns as cast (see :func:`cast_columns`).
+    """
+    absent_mask = df.isnull().any(axis=1).to_numpy()
+    quoted_mask = quotechar_mask(df, dialect.quote_patt)
+    casts, dtype_masks = ({}, {}) if schema is None else cast_columns(df, schema)
+    return absent_mask, quoted_mask, dtype_masks, casts
+
+
+def first_errors(
+    absent_mask: np.ndarray,
+    quoted_mask: np.ndarray,
+    dtype_masks: dict[str, np.ndarray],
+    starts: list[int] | np.ndarray = (0,),
+) -> list[tuple[int, str | None]]:
+    """
+    The first invalid row in the masks of :func:`error_masks` at or after each of the
+    row positions ``starts``, as its position (or the number of rows, if there is none)
+    and its kind of error, the first in check order (or ``None``).
+    """
+    invalid_mask = absent_mask | quoted_mask
+    for dtype_mask in dtype_masks.values():
+        invalid_mask |= dtype_mask
+    invalid_pos = np.append(np.flatnonzero(invalid_mask), len(invalid_mask))
+    errors = []
+    for row_pos in invalid_pos[np.searchsorted(invalid_pos, starts)].tolist():
+        if row_pos == len(invalid_mask):
+            kind = None
+        elif absent_mask[row_pos]:
+            kind = "absent_field"
+        elif quoted_mask[row_pos]:
+            kind = "quotechar"
+        else:
+            kind = "dtype"
+        errors.append((row_pos, kind))
+    return errors
+
+
+@instrument("validate", measure=lambda result, df, *args, **kwargs: (0, len(df)))
 def validate_df(
     df,
-    escapechar=r"\\",
-    quotechar='"',
-    doublequote=True,
-    verbose=True,
-) -> None | list[dict[str, str]]:
+    dialect: Dialect = Dialect(),
+    verbose=False,
+    return_rows=True,
+    schema: CsvSchema | None = None,
+    return_frame: bool | str = False,
+) -> list[dict[str, str]] | pd.DataFrame | ValidationResult:
     """
     Validate that the DataFrame does not contain ``None`` values and does not have
-    ``quotechar`` characters within any field values. Arguments other than those below
-    are the same as those passed to :function:`pandas.read_csv` (``escapechar``,
-    ``quotechar``, ``doublequote``).
+    ``quotechar`` characters within any field values.
 
     Args:
-      df      : (:class:`pd.DataFrame`) DataFrame which can be iterated to give rows to
-                be validated in the form of :class:`pd.Series` objects (one per row).
-      verbose : Whether to print the rows once validated (default: ``False``)
+      df          : (:class:`pd.DataFrame`) DataFrame whose rows are to be validated.
+                    The checks are made on whole columns at once, and the first
+                    offending row is reported (as a :class:`dict`) in the error message.
+      dialect     : (:class:`Dialect`) The ``quotechar`` and ``escapechar`` to validate
+                    with (the same as those passed to :function:`pandas.read_csv`).
+      verbose     : Whether to print the rows once validated (default: ``False``)
+      return_rows : Whether to return the validated rows (as a list of :class:`dict`) and
+                    raise a :class:`ValueError` at the first invalid row, or else return
+                    a :class:`ValidationResult` (default: ``True``)
+      schema      : (:class:`CsvSchema`) If given, its dialect is validated with (in place
+                    of ``dialect``), and the values of each column with a dtype hint are
+                    also validated to be castable to it by :func:`cast_columns`.
+      return_frame : Whether to return the validated DataFrame in place of the rows, with
+                     the columns with dtype hints replaced by their values as cast in
+                     validating them (see :func:`typed_frame`), so a valid block is
+                     parsed only once. If ``"arrow"`` a :class:`pyarrow.Table` is
+                     returned instead (default: ``False``)
     """
-    n_matchable = 1 + int(doublequote)
-    re_patt_str = (
-        rf".*((?<!({escapechar}))({quotechar}))" + r"{1," + f"{n_matchable}" + r"}.*"
-    )
-    re_patt = re.compile(re_patt_str)
-    validated_rows = []
-    output = []
-    for row_idx, row_series in df.iterrows():
-        row = row_series.to_dict()
-        if None in row.values():
+    if schema is not None:
+        dialect = schema.dialect
+    quotechar = dialect.quotechar
+    # Column-wise masks (one bool per row) rather than iterating rows of the DataFrame
+    absent_mask, quoted_mask, dtype_masks, casts = error_masks(df, dialect, schema)
+    [(row_pos, kind)] = first_errors(absent_mask, quoted_mask, dtype_masks)
+    if kind is not None:
+        if not return_rows:
+            return ValidationResult(row_pos, error_pos=row_pos, error_kind=kind)
+        row = df.iloc[row_pos].to_dict()
+        if kind == "absent_field":
             raise ValueError(f"Absent field (incomplete row) at {row=}")
-        if any(isinstance(v, str) and re_patt.match(v) for v in row.values()):
+        if kind == "quotechar":
             raise ValueError(f"{quotechar=} found in {row=}")
-        validated_rows.append(row)
+        col_name = next(name for name, mask in dtype_masks.items() if mask[row_pos])
+        dtype = schema.dtype_map()[col_name]
+        raise ValueError(f"Value not castable to {dtype=} in column {col_name!r} of {row=}")
+    if not return_rows:
+        return ValidationResult(len(df))
+    if return_frame:
+        return frame_output(typed_frame(df, casts, schema), return_frame)
+    validated_rows = df.to_dict(orient="records")
     if verbose:
         for row in validated_rows:
             print(row)  # Only print rows if entire DataFrame validated
     return validated_rows
 
 
-def validate_str(input_str, sample_colnames=None):
+def validate_str(
+    input_str,
+    sample_colnames=None,
+    chunksize: int | None = None,
+    return_rows=True,
+    schema: CsvSchema | None = None,
+    return_frame: bool | str = False,
+):
+    """
+    Validate the string ``input_str``, using the provided column names (or else the
+    header row of the string). If ``chunksize`` is given, the string is parsed that many
+    rows at a time with :func:`iter_validate`, stopping at the first invalid row.
+
+    If ``return_rows`` is ``False``, a :class:`ValidationResult` is returned instead of
+    the rows, and neither an invalid row nor a :class:`ParserError` raises an error.
+
+    If a ``schema`` (:class:`CsvSchema`) is given, its names and dialect are used, so the
+    string need not (and should not) begin with the header row.
+
+    If ``return_frame`` is given, the validated DataFrame (or Arrow table) is returned in
+    place of the rows, typed by the schema's dtype hints (see :func:`validate_df`), and
+    the chunks of a chunked string are concatenated into one.
+    """
+    dialect = Dialect() if schema is None else schema.dialect
+    if schema is not None:
+        sample_colnames = list(schema.names)
+    if sample_colnames is None:
+        n_cols = next(iter_field_counts(input_str.encode(), dialect))[0]  # The header row
+    else:
+        n_cols = len(sample_colnames)
+    if return_rows and return_frame:
+        if chunksize is None:
+            df_chunks = [make_df(n_cols, input_str, sample_colnames, dialect=dialect)]
+        else:
+            df_chunks = iter_df_chunks(
+                n_cols, input_str, chunksize, sample_colnames, dialect=dialect
+            )
+        frames = [
+            validate_df(df_chunk, dialect=dialect, schema=schema, return_frame=True)
+            for df_chunk in df_chunks
+        ]
+        df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+        return frame_output(df, return_frame)
+    if return_rows:
+        if chunksize is not None:
+            validated = iter_validate(
+                n_cols, input_str, chunksize, sample_colnames, dialect=dialect, schema=schema
+            )
+            return list(validated)
+        df = make_df(n_cols, input_str, sample_colnames, dialect=dialect)
+        return validate_df(df, dialect=dialect, schema=schema)
+    n_rows = 0
+    try:
+        if chunksize is None:
+            df_chunks = [make_df(n_cols, input_str, sample_colnames, dialect=dialect)]
+        else:
+            df_chunks = iter_df_chunks(
+                n_cols, input_str, chunksize, sample_colnames, dialect=dialect
+            )
+        for df_chunk in df_chunks:
+            result = validate_df(df_chunk, dialect=dialect, return_rows=False, schema=schema)
+            if not result.valid:
+                error_pos = n_rows + result.error_pos
+                return ValidationResult(error_pos, error_pos=error_pos, error_kind=result.error_kind)
+            n_rows += result.n_rows
+    except ParserError:
+        return ValidationResult(n_rows, error_kind="parser_error")
+    return ValidationResult(n_rows)
+
+
+snippet_sentinel = "\x1fend of snippet\x1f"
+
+
+def validate_many(snippets: list[str], schema: CsvSchema) -> list[ValidationResult]:
+    """
+    Validate many short CSV strings (of rows without a header row, such as the rows
+    either side of each candidate partition boundary) as :func:`validate_str` does with
+    ``return_rows=False``, but parsing and checking them all in a single pass: the
+    snippets are joined with a sentinel row (of ``snippet_sentinel`` in every column)
+    after each, parsed into one DataFrame, checked a column at a time by
+    :func:`error_masks`, and the first invalid row of each snippet is found from the
+    positions of the sentinel rows. The fixed cost of each parse and check is paid once
+    per batch rather than once per snippet.
+
+    A snippet which could not be parsed alone (e.g. it has too many fields, or ends in
+    an open quote, which would swallow the sentinel row after it) makes the batch
+    unsplittable, in which case each half of the batch is validated separately, down to
+    single snippets (validated by :func:`validate_str`).
+
+    Returns:
+      A :class:`ValidationResult` per snippet, in order, with the ``error_pos`` of each
+      counting the rows of its own snippet.
+    """
+    if len(snippets) <= 1:
+        return [validate_str(snippet, return_rows=False, schema=schema) for snippet in snippets]
+    dialect = schema.dialect
+    sep, term = dialect.delimiter, dialect.lineterminator
+    sentinel_row = sep.join([snippet_sentinel] * schema.n_cols) + term
+    batch_str = "".join(
+        (snippet if not snippet or snippet.endswith(term) else snippet + term) + sentinel_row
+        for snippet in snippets
+    )
+    try:
+        df = make_df(schema.n_cols, batch_str, list(schema.names), dialect=dialect)
+    except ParserError:
+        df = None
+    if df is not None:
+        is_sentinel = (df == snippet_sentinel).all(axis=1).to_numpy()
+        # Each sentinel row ends a snippet, so there is one per snippet unless a field was
+        # left open (so the sentinel row after it was read as part of a quoted value)
+        if is_sentinel.sum() != len(snippets) or not is_sentinel[-1]:
+            df = None
+    if df is None:
+        mid = len(snippets) // 2
+        return validate_many(snippets[:mid], schema) + validate_many(snippets[mid:], schema)
+    sentinel_pos = np.flatnonzero(is_sentinel)
+    ends = sentinel_pos - np.arange(len(sentinel_pos))  # Row ends once sentinels are dropped
+    starts = np.concatenate([[0], ends[:-1]])
+    rows_df = df[~is_sentinel].reset_index(drop=True)
+    absent_mask, quoted_mask, dtype_masks, _ = error_masks(rows_df, dialect, schema)
+    # The first invalid row at or after the start of each snippet (valid if not before its end)
+    errors = first_errors(absent_mask, quoted_mask, dtype_masks, starts)
+    results = []
+    for start, end, (row_pos, kind) in zip(starts.tolist(), ends.tolist(), errors):
+        if row_pos >= end:
+            results.append(ValidationResult(end - start))
+            continue
+        error_pos = row_pos - start
+        results.append(ValidationResult(error_pos, error_pos=error_pos, error_kind=kind))
+    return results
+
+
+def iter_validate(
+    n_cols: int,
+    rows_str: str,
+    chunksize: int,
+    names: list[str] | None = None,
+    sep: str = ",",
+    engine: str = "c",
+    dialect: Dialect | None = None,
+    schema: CsvSchema | None = None,
+) -> Iterator[dict[str, str]]:
     """
-    Validate the string ``input_str``, using the provided column names.
+    Lazily validate the rows of a CSV string, parsed ``chunksize`` rows at a time by
+    :func:`iter_df_chunks` and validated a chunk at a time by :func:`validate_df` (with
+    the ``schema``, if given, whose dialect is parsed with in place of ``dialect``). The
+    validated rows are yielded, and the first invalid row raises :class:`ValueError`
+    before any further chunks of the string are parsed.
     """
-    df = make_df(input_str, names=sample_colnames)
-    return validate_df(df)
+    if schema is not None:
+        dialect = schema.dialect
+    elif dialect is None:
+        dialect = Dialect(delimiter=sep)
+    chunks = iter_df_chunks(n_cols, rows_str, chunksize, names, engine=engine, dialect=dialect)
+    for df_chunk in chunks:
+        yield from validate_df(df_chunk, dialect=dialect, verbose=False, schema=schema)
+
 
 def trivial_return(value):
     "Return a value unchanged (used to override pandas CSV parser dtype conversion)."
     return value
 
 
-def make_df(n_cols: int, rows_str: str, names: list[str] | None = None) -> pd.DataFrame:
+def field_counts(
+    rows_bytes: bytes, dialect: Dialect = Dialect(), return_open=False
+) -> np.ndarray | tuple[np.ndarray, int | None]:
+    """
+    Count the fields in every row of the CSV bytes at once with array operations, where
+    any delimiter or lineterminator which comes after an odd number of quotechars is
+    within a quoted field, so is not counted. Only quotechars which could open or close
+    a field (those beside a delimiter, lineterminator, or either end of the bytes) are
+    counted, as any other quotechar is read literally by pandas. Blank
+    lines are skipped, as they are by pandas. The ``lineterminator`` must be one byte, or
+    ``"\\r\\n"`` (of which only the ``"\\n"`` is looked at, as the fields are counted the
+    same either way).
+
+    If ``return_open`` is ``True``, the position from which the quoting cannot be followed
+    is also returned (or ``None`` if it can be followed to the end of the bytes): that of
+    the last quotechar if they end inside a quoted field (after an odd number of those
+    quotechars), or else of the first quotechar which would open a field but comes after
+    the start of one (so is read literally by pandas, and the rows counted after it are
+    not those parsed), of the first which closes a field but is followed by more of it
+    (so the C parser would append that text to the field), or of the first which is
+    within a quoted field but not doubled (so would close it), whichever is first.
+    """
+    arr = np.frombuffer(rows_bytes, dtype=np.uint8)
+    term_byte, delim_byte = ord(dialect.lineterminator[-1]), ord(dialect.delimiter)
+    term_first = ord(dialect.lineterminator[0])  # The byte a closing quotechar is before
+    term_pos = np.flatnonzero(arr == term_byte)
+    delim_pos = np.flatnonzero(arr == delim_byte)
+    quote_pos = all_quote_pos = np.flatnonzero(arr == ord(dialect.quotechar))
+    at_field_edge = np.zeros(0, dtype=bool)
+    if len(quote_pos):
+        prev_bytes = arr[np.maximum(quote_pos - 1, 0)]
+        next_bytes = arr[np.minimum(quote_pos + 1, len(arr) - 1)]
+        at_field_edge = (
+            (quote_pos == 0)
+            | (quote_pos == len(arr) - 1)
+            | (prev_bytes == term_byte)
+            | (prev_bytes == delim_byte)
+            | (next_bytes == term_first)
+            | (next_bytes == delim_byte)
+        )
+        quote_pos = quote_pos[at_field_edge]
+        # A position is unquoted if an even number of quotechars come before it
+        term_pos = term_pos[np.searchsorted(quote_pos, term_pos) % 2 == 0]
+        delim_pos = delim_pos[np.searchsorted(quote_pos, delim_pos) % 2 == 0]
+    row_ends = term_pos
+    if len(arr) and (len(term_pos) == 0 or term_pos[-1] != len(arr) - 1):
+        row_ends = np.append(term_pos, len(arr))  # The unterminated last row
+    row_starts = np.concatenate([[0], term_pos[: len(row_ends) - 1] + 1])
+    n_delims = np.searchsorted(delim_pos, row_ends) - np.searchsorted(delim_pos, row_starts)
+    n_fields = (n_delims + 1)[row_ends > row_starts]
+    if return_open:
+        open_pos = quote_pos[::2]
+        open_prev = arr[np.maximum(open_pos - 1, 0)]
+        at_field_start = (open_pos == 0) | (open_prev == term_byte) | (open_prev == delim_byte)
+        stuck_pos = open_pos[~at_field_start][:1].tolist()
+        close_pos = quote_pos[1::2]
+        close_next = arr[np.minimum(close_pos + 1, len(arr) - 1)]
+        at_field_end = (
+            (close_pos == len(arr) - 1) | (close_next == term_first) | (close_next == delim_byte)
+        )
+        stuck_pos += close_pos[~at_field_end][:1].tolist()
+        # Every run of quotechars within a quoted field must be of doubled quotechars
+        inner_pos = all_quote_pos[~at_field_edge]
+        inner_pos = inner_pos[np.searchsorted(quote_pos, inner_pos) % 2 == 1]
+        if len(inner_pos):
+            run_starts = np.flatnonzero(np.diff(inner_pos, prepend=-2) != 1)
+            run_lens = np.diff(run_starts, append=len(inner_pos))
+            stuck_pos += inner_pos[run_starts[run_lens % 2 == 1]][:1].tolist()
+        if len(quote_pos) % 2:
+            stuck_pos.append(int(quote_pos[-1]))
+        return n_fields, min(stuck_pos, default=None)
+    return n_fields
+
+
+def iter_field_counts(
+    rows_bytes: bytes, dialect: Dialect = Dialect(), span: int = 1 << 16
+) -> Iterator[np.ndarray]:
+    """
+    Count the fields in every row of the CSV bytes as :func:`field_counts` does, but a
+    range of about ``span`` bytes at a time, each ending at a lineterminator (the range
+    is doubled while its quoting cannot be followed, as when it would end inside a quoted
+    field), so that the rows at the start are counted without scanning the rest of the
+    bytes. If the quoting cannot be followed to the end of the bytes, a
+    :class:`ParserError` is raised once the rows before the one it cannot be followed
+    from have been counted.
+
+    Yields:
+      The field counts of the rows of each range, in order.
+    """
+    term = dialect.lineterminator.encode()
+    start = 0
+    while start < len(rows_bytes):
+        end = rows_bytes.find(term, start + span - 1)
+        end = len(rows_bytes) if end == -1 else end + len(term)
+        n_fields, open_pos = field_counts(rows_bytes[start:end], dialect, return_open=True)
+        if open_pos is None:
+            yield n_fields
+            start = end
+        elif end < len(rows_bytes):
+            span *= 2
+        else:
+            while open_pos is not None:
+                # Count the rows before the one the quoting cannot be followed from
+                term_pos = rows_bytes.rfind(term, start, start + open_pos)
+                if term_pos == -1:
+                    break
+                end = term_pos + len(term)
+                n_fields, open_pos = field_counts(rows_bytes[start:end], dialect, True)
+            if open_pos is None:
+                yield n_fields
+                start = end
+            raise ParserError(f"The quoting of the rows from byte {start} cannot be followed")
+
+
+@contextmanager
+def lost_fields_raise():
+    """
+    Raise a :class:`ParserError` in place of the :class:`ParserWarning` of the C parser
+    dropping the fields of a row beyond the names (as it does with ``index_col=False``),
+    so that the row is not read with its data lost.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", ParserWarning)
+        try:
+            yield
+        except ParserWarning as e:
+            raise ParserError(str(e)) from e
+
+
+@instrument(
+    "parse",
+    measure=lambda df, n_cols, rows_str, *args, **kwargs: (len(rows_str.encode()), len(df)),
+)
+def make_df(
+    n_cols: int,
+    rows_str: str,
+    names: list[str] | None = None,
+    sep: str = ",",
+    engine: str = "c",
+    dialect: Dialect | None = None,
+) -> pd.DataFrame:
     """
     Read a CSV into a DataFrame without NaN value conversion so that any None values are
     only present due to a missing field, permitting a check for parsed CSV column count.
+    It is parsed in the ``dialect`` (default: the default :class:`Dialect` with the
+    delimiter ``sep``), see :func:`read_csv_kwargs`.
+
+    With the (default) ``"c"`` engine every field is read unconverted, and absent fields
+    (which the C parser fills with empty strings) are set to ``None`` from the per-row
+    :func:`field_counts`. With the ``"python"`` engine absent fields are left as ``None``
+    by converting every field with :func:`trivial_return`, which is slower (see
+    :func:`read_python_df`). Either way, a row with too many fields raises a
+    :class:`ParserError` (the C parser's warning that it dropped them is raised as one,
+    see :func:`lost_fields_raise`).
     """
-    return pd.read_csv(
-        io.StringIO(rows_str),
+    if dialect is None:
+        dialect = Dialect(delimiter=sep)
+    if engine == "python":
+        return read_python_df(n_cols, rows_str, names, dialect=dialect)
+    read_kwargs = read_csv_kwargs(n_cols, names, dialect, engine)
+    try:
+        with lost_fields_raise():
+            df = pd.read_csv(io.StringIO(rows_str), **read_kwargs)
+    except ParserError:
+        df = None
+    if df is None and names is not None:
+        # The C parser refuses more names than fields in some blocks of only short rows,
+        # so read them again before a padding row of every field, then drop it
+        term = dialect.lineterminator
+        padding_row = dialect.delimiter * (n_cols - 1) + term
+        padded_str = (rows_str if not rows_str or rows_str.endswith(term) else rows_str + term)
+        try:
+            with lost_fields_raise():
+                df = pd.read_csv(io.StringIO(padded_str + padding_row), **read_kwargs)
+            df = df.iloc[:-1]
+        except ParserError:
+            pass
+    n_fields, open_pos = field_counts(rows_str.encode(), dialect, return_open=True)
+    if names is None:
+        n_fields = n_fields[1:]  # The header row
+    if df is None or open_pos is not None or len(n_fields) != len(df):
+        # Quoting the field counts could not follow (e.g. a closed quote then more text)
+        count("python_engine_fallbacks")
+        return read_python_df(n_cols, rows_str, names, dialect=dialect)
+    set_absent_fields(df, n_fields, n_cols)
+    return df
+
+
+def read_python_df(
+    n_cols: int,
+    rows_str: str,
+    names: list[str] | None = None,
+    sep: str = ",",
+    dialect: Dialect | None = None,
+) -> pd.DataFrame:
+    """
+    Read a CSV with the python engine for :func:`make_df`, having first counted the
+    fields of each (non-blank) row as that engine reads them, with the :mod:`csv` module
+    it is built on. A row with too many fields raises a :class:`ParserError` (see
+    :func:`check_field_counts`) rather than being read with its first field as the index
+    (or its last fields dropped), as does an error of the :mod:`csv` module.
+    """
+    if dialect is None:
+        dialect = Dialect(delimiter=sep)
+    rows = csv_rows(rows_str, dialect)
+    n_fields = np.array([len(row) for row in rows if row], dtype=np.int64)
+    if names is None:
+        n_fields = n_fields[1:]  # The header row
+    check_field_counts(n_fields, n_cols)
+    python_kwargs = read_csv_kwargs(n_cols, names, dialect, engine="python")
+    try:
+        return pd.read_csv(io.StringIO(rows_str), **python_kwargs)
+    except csv.Error as e:
+        raise ParserError(str(e)) from e  # Not always wrapped by pandas
+
+
+def iter_df_chunks(
+    n_cols: int,
+    rows_str: str,
+    chunksize: int,
+    names: list[str] | None = None,
+    sep: str = ",",
+    engine: str = "c",
+    dialect: Dialect | None = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Read a CSV into DataFrames of ``chunksize`` rows as :func:`make_df` does, parsing
+    each chunk only when the previous one has been consumed. The C parser reads the
+    encoded bytes (so the string is not copied into it up front) and the field counts of
+    each chunk are computed only as far as they are needed, by :func:`iter_field_counts`.
+    Where :func:`make_df` would fall back to the python engine, the rows not yet yielded
+    are read by :func:`iter_python_chunks` instead.
+    """
+    if dialect is None:
+        dialect = Dialect(delimiter=sep)
+    if engine == "python":
+        yield from iter_python_chunks(n_cols, rows_str, chunksize, names, dialect=dialect)
+        return
+    rows_bytes = rows_str.encode()
+    read_kwargs = read_csv_kwargs(n_cols, names, dialect, engine)
+    range_counts = iter_field_counts(rows_bytes, dialect)
+    n_fields = np.empty(0, dtype=np.int64)  # The counts of the rows not yet read
+    skip_header = names is None
+    row_pos = 0
+    with pd.read_csv(io.BytesIO(rows_bytes), chunksize=chunksize, **read_kwargs) as reader:
+        while True:
+            try:
+                with lost_fields_raise():
+                    df_chunk = next(reader, None)
+            except ParserError:
+                break
+            if df_chunk is None:
+                try:
+                    if len(n_fields) or next(range_counts, None) is not None:
+                        break  # More rows were counted than parsed
+                except ParserError:
+                    break
+                return
+            try:
+                while len(n_fields) < len(df_chunk) + skip_header:
+                    next_counts = next(range_counts, None)
+                    if next_counts is None:
+                        break
+                    n_fields = np.concatenate([n_fields, next_counts])
+            except ParserError:
+                break
+            if skip_header:
+                n_fields, skip_header = n_fields[1:], False  # The header row
+            chunk_n_fields, n_fields = n_fields[: len(df_chunk)], n_fields[len(df_chunk) :]
+            if len(chunk_n_fields) != len(df_chunk):
+                break
+            set_absent_fields(df_chunk, chunk_n_fields, n_cols, row_pos)
+            row_pos += len(df_chunk)
+            yield df_chunk
+    # Quoting the field counts could not follow, or the C parser refused the rows
+    count("python_engine_fallbacks")
+    yield from iter_python_chunks(
+        n_cols, rows_str, chunksize, names, row_offset=row_pos, dialect=dialect
+    )
+
+
+def iter_python_chunks(
+    n_cols: int,
+    rows_str: str,
+    chunksize: int,
+    names: list[str] | None = None,
+    sep: str = ",",
+    row_offset: int = 0,
+    dialect: Dialect | None = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Read a CSV into DataFrames of ``chunksize`` rows as :func:`read_python_df` does,
+    counting the fields of each chunk's rows (with the :mod:`csv` module) as it is read,
+    and skipping the first ``row_offset`` rows (those already read by another engine).
+    An error of the :mod:`csv` module is raised as a :class:`ParserError`.
+    """
+    if dialect is None:
+        dialect = Dialect(delimiter=sep)
+    row_n_fields = (len(row) for row in csv_rows(rows_str, dialect) if row)
+    if names is None:
+        next(row_n_fields, None)  # The header row
+    python_kwargs = read_csv_kwargs(n_cols, names, dialect, engine="python")
+    row_pos = 0
+    with pd.read_csv(io.StringIO(rows_str), chunksize=chunksize, **python_kwargs) as reader:
+        while True:
+            try:
+                df_chunk = next(reader, None)
+            except csv.Error as e:
+                raise ParserError(str(e)) from e  # Not wrapped by pandas when chunked
+            if df_chunk is None:
+                return
+            n_fields = np.fromiter(islice(row_n_fields, len(df_chunk)), dtype=np.int64)
+            check_field_counts(n_fields, n_cols, row_pos)
+            n_skipped = max(row_offset - row_pos, 0)
+            row_pos += len(df_chunk)
+            if n_skipped < len(df_chunk):
+                yield df_chunk.iloc[n_skipped:]
+
+
+def read_csv_kwargs(
+    n_cols: int, names: list[str] | None, dialect: Dialect, engine: str
+) -> dict[str, object]:
+    """
+    The arguments to :function:`pandas.read_csv` for :func:`make_df` with each engine, in
+    the ``dialect``. The escapechar is not passed, so escapes are left in the fields
+    where the quotechar pattern of the dialect looks for them (see :func:`validate_df`).
+    """
+    dialect_kwargs = dict(
+        sep=dialect.delimiter, quotechar=dialect.quotechar, doublequote=dialect.doublequote
+    )
+    if engine == "python":
+        return dict(
+            names=names,
+            **dialect_kwargs,
+            keep_default_na=False,
+            na_filter=False,
+            na_values=[],
+            engine="python",
+            converters=dict.fromkeys(range(n_cols), trivial_return),
+        )
+    if len(dialect.lineterminator) == 1 and dialect.lineterminator != "\n":
+        dialect_kwargs["lineterminator"] = dialect.lineterminator  # C splits "\r\n" itself
+    return dict(
         names=names,
-        keep_default_na=False,
+        **dialect_kwargs,
+        dtype=object,
         na_filter=False,
-        na_values=[],
-        engine="python",
-        converters=dict.fromkeys(range(n_cols), trivial_return),
+        engine="c",
+        index_col=False,
     )
 
 
+def csv_rows(rows_str: str, dialect: Dialect) -> Iterator[list[str]]:
+    """
+    The rows of a CSV as the python engine reads them in the ``dialect``, by the
+    :mod:`csv` module it is built on (without the escapechar, see :func:`read_csv_kwargs`).
+    """
+    return csv.reader(
+        io.StringIO(rows_str),
+        delimiter=dialect.delimiter,
+        quotechar=dialect.quotechar,
+        doublequote=dialect.doublequote,
+    )
+
+
+def check_field_counts(n_fields: np.ndarray, n_cols: int, row_offset: int = 0) -> None:
+    """
+    Raise a :class:`ParserError` if any row has more than ``n_cols`` fields. The
+    ``row_offset`` is the position of the first row counted in the whole CSV.
+    """
+    if (n_fields > n_cols).any():
+        row_pos = (n_fields > n_cols).argmax()
+        n_seen = n_fields[row_pos]
+        raise ParserError(f"Expected {n_cols} fields in row {row_offset + row_pos}, saw {n_seen}")
+
+
+def set_absent_fields(
+    df: pd.DataFrame, n_fields: np.ndarray, n_cols: int, row_offset: int = 0
+) -> None:
+    """
+    Set the fields of the DataFrame beyond the field count of their row to ``None`` (in
+    place), or raise a :class:`ParserError` if any row has more than ``n_cols`` fields.
+    The ``row_offset`` is the position of the DataFrame's first row in the whole CSV.
+    """
+    check_field_counts(n_fields, n_cols, row_offset)
+    for col_pos in range(1, n_cols):
+        df.iloc[n_fields <= col_pos, col_pos] = None
+
+
+@mark.parametrize("engine", ["c", "python"])
 @mark.parametrize("n_cols", [2])
 @mark.parametrize(
     "rows_str,expected,err_msg",
@@ -80,26 +809,28 @@ def make_df(n_cols: int, rows_str: str, names: list[str] | None = None) -> pd.Da
         (
             "hello,world\nfoo\nbar,baz\n",
             {"hello": {0: "foo", 1: "bar"}, "world": {0: None, 1: "baz"}},
-            "Absent field \(incomplete row\) at row={'hello': 'foo', 'world': None}",
+            r"Absent field \(incomplete row\) at row={'hello': 'foo', 'world': None}",
         ),
         (
             "hello,world\nfoo\n3,4\n",
             {"hello": {0: "foo", 1: "3"}, "world": {0: None, 1: "4"}},
-            "Absent field \(incomplete row\) at row={'hello': 'foo', 'world': None}",
+            r"Absent field \(incomplete row\) at row={'hello': 'foo', 'world': None}",
         ),
     ],
 )
-def test_absent_field_str(n_cols, rows_str, expected, err_msg):
+def test_absent_field_str(n_cols, rows_str, expected, err_msg, engine):
     """
     Show that an absent field can be detected from the pandas parser as ``None`` if the
-    converters are passed as a trivial function returning its input (preventing dtype conversion).
+    converters are passed as a trivial function returning its input (preventing dtype conversion),
+    or from the field counts when using the C parser.
     """
-    df = make_df(n_cols, rows_str)
+    df = make_df(n_cols, rows_str, engine=engine)
     assert df.to_dict() == expected
     with raises(ValueError, match=err_msg):
         validate_df(df)
 
 
+@mark.parametrize("engine", ["c", "python"])
 @mark.parametrize("n_cols", [2])
 @mark.parametrize(
     "rows_str,expected",
@@ -114,11 +845,403 @@ def test_absent_field_str(n_cols, rows_str, expected, err_msg):
         ),
     ],
 )
-def test_empty_field_str(n_cols, rows_str, expected):
+def test_empty_field_str(n_cols, rows_str, expected, engine):
     """
     Show that an empty field can be detected from the pandas parser as the empty string if the
-    converters are passed as a trivial function returning its input (preventing dtype conversion).
+    converters are passed as a trivial function returning its input (preventing dtype conversion),
+    or from the field counts when using the C parser.
     """
-    df = make_df(n_cols, rows_str)
+    df = make_df(n_cols, rows_str, engine=engine)
     assert df.to_dict() == expected
     validate_df(df)
+
+
+@mark.parametrize("n_cols", [2])
+@mark.parametrize(
+    "rows_str,err_msg",
+    [
+        (
+            'hello,world\nfoo,bar\nba"z,qux\nfoo\n',
+            "quotechar='\"' found in row={'hello': 'ba\"z', 'world': 'qux'}",
+        ),
+        (
+            'hello,world\nfoo,bar\nfoo\nba"z,qux\n',
+            "Absent field \\(incomplete row\\) at row={'hello': 'foo', 'world': None}",
+        ),
+    ],
+)
+def test_first_invalid_row_str(n_cols, rows_str, err_msg):
+    """
+    Show that when several rows are invalid, only the first of them (in row order, not
+    column order or check order) is reported in the error.
+    """
+    df = make_df(n_cols, rows_str)
+    with raises(ValueError, match=err_msg):
+        validate_df(df)
+
+
+@mark.parametrize(
+    "rows_bytes,expected",
+    [
+        (b"hello,world\nfoo\n\nbar,baz\n", [2, 1, 2]),
+        (b'1,2,hello\n5,6,"foo\n7,8,bar\n9,10,baz"\n11,12', [3, 3, 2]),
+        (b'1,2,"say \\"hi"\n3,4,""""\n', [3, 3]),
+        (b'1,ba"z\n""""\n', [2, 1]),
+        (b"", []),
+    ],
+)
+def test_field_counts(rows_bytes, expected):
+    """
+    Show that delimiters and lineterminators in quoted fields are not counted (but that
+    quotechars within unquoted fields are ignored), and that blank lines are skipped.
+    """
+    assert field_counts(rows_bytes).tolist() == expected
+
+
+@mark.parametrize("engine", ["c", "python"])
+@mark.parametrize("n_cols", [2])
+@mark.parametrize(
+    "rows_str,err_msg",
+    [
+        (
+            'hello,world\nfoo,bar\nbaz\n' + "bar,baz\n" * 10 + 'qux,"unclosed\n',
+            "Absent field \\(incomplete row\\) at row={'hello': 'baz', 'world': None}",
+        ),
+    ],
+)
+def test_iter_validate_early_exit(n_cols, rows_str, err_msg, engine):
+    """
+    Show that validating lazily in chunks yields the valid rows of the first chunk, then
+    stops at the invalid row in the second chunk, never reaching the unclosed quote at
+    the end (which makes parsing the whole string at once raise a :class:`ParserError`).
+    """
+    with raises(ParserError):
+        make_df(n_cols, rows_str, engine=engine)
+    validated = iter_validate(n_cols, rows_str, chunksize=1, engine=engine)
+    assert next(validated) == {"hello": "foo", "world": "bar"}
+    with raises(ValueError, match=err_msg):
+        next(validated)
+
+
+@mark.parametrize("engine", ["c", "python"])
+@mark.parametrize(
+    "rows_str,names,expected",
+    [
+        ("22,1\n", ["a", "b", "c"], [{"a": "22", "b": "1", "c": None}]),
+        ("22\n1\n", ["a", "b"], [{"a": "22", "b": None}, {"a": "1", "b": None}]),
+    ],
+)
+def test_make_df_short_rows(rows_str, names, expected, engine):
+    """
+    Show that a block of only short rows (which the C parser refuses to read with more
+    names than fields) is read with its absent fields as ``None``, as by the python engine.
+    """
+    df = make_df(len(names), rows_str, names=names, engine=engine)
+    assert df.to_dict(orient="records") == expected
+
+
+@mark.parametrize("engine", ["c", "python"])
+@mark.parametrize("rows_str", ['x,y\nb",a,\n\nb,,baa', "x,y\n1,2,3\n", "x,y\n1,2\n3,4,5\n"])
+def test_make_df_too_many_fields(rows_str, engine):
+    """
+    Show that a row with too many fields raises a :class:`ParserError` with either engine
+    (and whether or not the C engine falls back to the python engine, as for the stray
+    quotechar in the first string), rather than its first field becoming the index.
+    """
+    with raises(ParserError, match="Expected 2 fields in row"):
+        make_df(2, rows_str, engine=engine)
+    assert validate_str(rows_str, return_rows=False).error_kind == "parser_error"
+
+
+@mark.parametrize("engine", ["c", "python"])
+@mark.parametrize(
+    "rows_str,err_msg",
+    [('y,"a,b","q"x,b"\n', "Expected 3 fields in row 0"), ('"q"x,,b"\n', "expected after")],
+)
+def test_make_df_closed_quote_then_text(rows_str, err_msg, engine):
+    """
+    Show that a closing quotechar followed by more text (which the C parser appends to
+    the field) is refused as by the python engine, rather than the C parser dropping the
+    field beyond the names (with only a warning) or the field counts making a false
+    absent field.
+    """
+    with raises(ParserError, match=err_msg):
+        make_df(3, rows_str, names=["a", "b", "c"], engine=engine)
+    schema = CsvSchema(["a", "b", "c"])
+    for chunksize in [None, 1]:
+        result = validate_str(rows_str, chunksize=chunksize, return_rows=False, schema=schema)
+        assert result == ValidationResult(0, error_kind="parser_error")
+
+
+@mark.parametrize("chunksize,n_rows", [(None, 0), (1, 2), (2, 2)])
+def test_validate_str_csv_error(chunksize, n_rows):
+    """
+    Show that a closing quotechar followed by more text, which the :mod:`csv` module
+    refuses in the python engine, is reported as a parser error (after the rows of the
+    chunks before it) whether or not the string is chunked, rather than raising its error.
+    """
+    rows_str = 'y,1,\n"a,b",1,"a,b"\n"open,"e",\n'
+    schema = CsvSchema(["a", "b", "c"])
+    result = validate_str(rows_str, chunksize=chunksize, return_rows=False, schema=schema)
+    assert result == ValidationResult(n_rows, error_kind="parser_error")
+    with raises(ParserError):
+        list(iter_python_chunks(3, rows_str, 1, names=list(schema.names)))
+
+
+@mark.parametrize("chunksize", [None, 1, 2, 3])
+@mark.parametrize(
+    "rows_str,expected",
+    [
+        ('x,y\nb",a,\n\nb,,baa', ValidationResult(0, None, None, "parser_error")),
+        ('x,y\nc,d\nb",a\n"e",f\n', ValidationResult(1, None, 1, "quotechar")),
+        ("x,y,z\n22,1\n", ValidationResult(0, None, 0, "absent_field")),
+        ("x,y\n1,2\n3,4\n5,6,7\n", ValidationResult(0, None, None, "parser_error")),
+    ],
+)
+def test_validate_str_chunked_result(rows_str, chunksize, expected):
+    """
+    Show that the verdict on a string is the same whether or not it is chunked, including
+    when the C engine falls back to the python engine (on a quotechar read literally, or
+    a block of only short rows) part way through. A row with too many fields is reported
+    as a parser error after the rows of the chunks before it.
+    """
+    result = validate_str(rows_str, chunksize=chunksize, return_rows=False)
+    if chunksize is not None and rows_str.endswith("5,6,7\n"):
+        expected = ValidationResult(2 // chunksize * chunksize, None, None, "parser_error")
+    assert result == expected
+
+
+def test_iter_field_counts_lazy():
+    """
+    Show that the field counts of the first rows are found from a range at the start of
+    the bytes (extended past a multiline field), not the whole of them.
+    """
+    rows_bytes = b'1,"a\nb\nc"\n' + b"2,d\n" * 1000
+    range_counts = iter_field_counts(rows_bytes, span=4)
+    assert next(range_counts).tolist() == [2]
+    assert np.concatenate(list(range_counts)).tolist() == [2] * 1000
+    assert field_counts(rows_bytes[:5], return_open=True)[1] == 2
+    assert field_counts(b'1,a"\n"b"\n', return_open=True)[1] == 3
+    open_counts = iter_field_counts(b'1,2\n3,"4\n')
+    assert next(open_counts).tolist() == [2]
+    with raises(ParserError, match="from byte 4 cannot be followed"):
+        next(open_counts)
+
+
+def test_validate_str_chunked():
+    """
+    Show that validating a string in chunks gives the same rows as all at once.
+    """
+    rows_str = 'hello,world\nfoo,bar\nbaz,"qux\nquux"\n'
+    expected = [{"hello": "foo", "world": "bar"}, {"hello": "baz", "world": "qux\nquux"}]
+    assert validate_str(rows_str) == expected
+    assert validate_str(rows_str, chunksize=1) == expected
+
+
+@mark.parametrize(
+    "rows_str,chunksize,expected",
+    [
+        ("hello,world\nfoo,bar\nbaz,qux\n", None, ValidationResult(2)),
+        ('hello,world\nfoo,bar\nba"z,qux\n', None, ValidationResult(1, None, 1, "quotechar")),
+        ("hello,world\nfoo,bar\nbaz,qux\nquux\n", 2, ValidationResult(2, None, 2, "absent_field")),
+        ('hello,world\nfoo,bar\nbaz,"qux\n', 1, ValidationResult(1, None, None, "parser_error")),
+    ],
+)
+def test_validate_str_result(rows_str, chunksize, expected):
+    """
+    Show that without returning the rows, the first invalid row is given by its position
+    (across all chunks) in a :class:`ValidationResult` rather than raising an error.
+    """
+    assert validate_str(rows_str, chunksize=chunksize, return_rows=False) == expected
+
+
+def test_validate_str_instrumented():
+    """
+    Show that parsing and validating a string are recorded as stages (with the rows of
+    each, the bytes (not characters) parsed, and the regex evaluations of the quotechar
+    check) while collecting.
+    """
+    rows_str = "hello,world\nfoo,bär\nbaz,qux\n"
+    with collect() as collector:
+        validate_str(rows_str, return_rows=False)
+    totals = collector.totals()
+    assert totals["stages"]["parse"]["rows"] == 2
+    assert totals["stages"]["parse"]["bytes"] == len(rows_str) + 1  # The UTF-8 of "ä"
+    assert totals["stages"]["validate"]["calls"] == 1
+    assert totals["events"] == {"regex_evaluations": 4}
+
+
+def test_validate_str_schema():
+    """
+    Show that a schema (inferred from the head of the file) gives the names and dialect
+    with which to validate the rows of a later partition, which has no header row.
+    """
+    schema = CsvSchema.from_head(b"hello\tworld\nfoo\tbar\n", Dialect(delimiter="\t"))
+    rows_str = 'baz\t"qux\nquux"\nfoo\tbar\n'
+    expected = [{"hello": "baz", "world": "qux\nquux"}, {"hello": "foo", "world": "bar"}]
+    assert validate_str(rows_str, schema=schema) == expected
+    assert validate_str(rows_str, chunksize=1, schema=schema) == expected
+    result = validate_str("foo\tbar\nbaz\n", return_rows=False, schema=schema)
+    assert result == ValidationResult(1, error_pos=1, error_kind="absent_field")
+
+
+@mark.parametrize("chunksize", [None, 1])
+@mark.parametrize("engine", ["c", "python"])
+def test_validate_str_dialect(chunksize, engine):
+    """
+    Show that every part of the schema's dialect (here its quotechar) reaches the parser
+    and the field counts, so a block valid by :func:`validate_bytes` is valid here too.
+    """
+    schema = CsvSchema(("a", "b"), Dialect(quotechar="'"))
+    rows_str = "1,'x,y'\n2,'p\nq'\n"
+    assert validate_str(rows_str, chunksize=chunksize, return_rows=False, schema=schema) == (
+        ValidationResult(2)
+    )
+    assert validate_str(rows_str, chunksize=chunksize, schema=schema) == [
+        {"a": "1", "b": "x,y"},
+        {"a": "2", "b": "p\nq"},
+    ]
+    dialect = schema.dialect
+    if chunksize is None:
+        df = make_df(2, rows_str, ["a", "b"], engine=engine, dialect=dialect)
+    else:
+        df = pd.concat(iter_df_chunks(2, rows_str, 1, ["a", "b"], engine=engine, dialect=dialect))
+    assert df["b"].tolist() == ["x,y", "p\nq"]
+
+
+typed_schema = CsvSchema.from_head(
+    b"intA,intB,strC\n", dtypes={"intA": "int64", "intB": "Int64"}
+)
+
+
+@mark.parametrize(
+    "rows_str,chunksize,expected",
+    [
+        ("1,2,hello\n3,,world\n", None, ValidationResult(2)),
+        ("1,2,hello\nworld,3,4\n", None, ValidationResult(1, None, 1, "dtype")),
+        ("1,2,hello\n3,4.5,world\n", 1, ValidationResult(1, None, 1, "dtype")),
+        (",2,hello\n", None, ValidationResult(0, None, 0, "dtype")),
+        ('1,2,"hello\n3,4,world"\n5,x,y\n', None, ValidationResult(1, None, 1, "dtype")),
+    ],
+)
+def test_validate_str_typed(rows_str, chunksize, expected):
+    """
+    Show that with the dtype hints of a schema, a row whose values cannot be cast to an
+    integer column (as when a misaligned split shifts a string into it) is invalid,
+    while an empty value is only valid in the nullable ``Int64`` column.
+    """
+    result = validate_str(rows_str, chunksize=chunksize, return_rows=False, schema=typed_schema)
+    assert result == expected
+
+
+def test_validate_df_typed_message():
+    """
+    Show that the first value not castable to its column's dtype is reported by column.
+    """
+    err_msg = "Value not castable to dtype='int64' in column 'intA' of row="
+    with raises(ValueError, match=err_msg):
+        validate_str("world,3,4\n", schema=typed_schema)
+
+
+@mark.parametrize(
+    "snippets,expected",
+    [
+        (
+            ["1,2,hello\n3,4,world\n", "5,6,foo\n", "", "7,8,bar"],
+            [ValidationResult(2), ValidationResult(1), ValidationResult(0), ValidationResult(1)],
+        ),
+        (
+            ["1,2,hello\nworld,3,4\n", '5,6,ba"r\n', "7,8\n9,10,baz\n", "11,12,qux\n"],
+            [
+                ValidationResult(1, None, 1, "dtype"),
+                ValidationResult(0, None, 0, "quotechar"),
+                ValidationResult(0, None, 0, "absent_field"),
+                ValidationResult(1),
+            ],
+        ),
+        (
+            ['1,2,"hello\n3,4,world\n', "5,6,foo\n", "7,8,bar,baz\n", '9,10,"qux\nquux"\n'],
+            [
+                ValidationResult(0, None, None, "parser_error"),
+                ValidationResult(1),
+                ValidationResult(0, None, None, "parser_error"),
+                ValidationResult(1),
+            ],
+        ),
+        (["22,1\n"], [ValidationResult(0, None, 0, "absent_field")]),
+        (
+            ["22,1\n", '"open,"open\n', 'b",x,1\n'],
+            [
+                ValidationResult(0, None, 0, "absent_field"),
+                ValidationResult(0, None, None, "parser_error"),
+                ValidationResult(0, None, 0, "quotechar"),
+            ],
+        ),
+    ],
+)
+def test_validate_many(snippets, expected):
+    """
+    Show that each snippet of a batch gets the result it would alone, including when
+    one ends in an open quote or has too many fields (so the batch is split), or has
+    only short rows, or quotes which the field counts cannot follow.
+    """
+    assert validate_many(snippets, typed_schema) == expected
+    assert [validate_str(s, return_rows=False, schema=typed_schema) for s in snippets] == expected
+
+
+def test_validate_many_agrees():
+    """
+    Show that random batches of snippets (of well and badly quoted fields, and of too few
+    and too many of them) each get the results their snippets would alone.
+    """
+    rng = random.Random(0)
+    fields = ["1", "22", "x", "", "1.5", '"a\nb"', 'b"', '"c""d"', '"open', '"q"x', ' "']
+    for _ in range(100):
+        snippets = [
+            "".join(
+                ",".join(rng.choices(fields, k=rng.randint(1, 4))) + "\n"
+                for _ in range(rng.randint(0, 3))
+            )
+            for _ in range(rng.randint(2, 6))
+        ]
+        alone = [validate_str(s, return_rows=False, schema=typed_schema) for s in snippets]
+        assert validate_many(snippets, typed_schema) == alone, snippets
+
+
+def test_validate_many_single_pass():
+    """
+    Show that a batch of valid snippets is parsed and validated once, not per snippet.
+    """
+    snippets = [f"{i},{i + 1},row {i}\n" for i in range(100)]
+    with collect() as collector:
+        results = validate_many(snippets, typed_schema)
+    assert results == [ValidationResult(1)] * 100
+    assert collector.stages["parse"][0] == 1
+
+
+@mark.parametrize("chunksize", [None, 1])
+def test_validate_str_frame(chunksize):
+    """
+    Show that the validated frame has the hinted columns cast (from the same casts that
+    validated them, so each row is parsed once) and the other columns as strings.
+    """
+    rows_str = '1,2,hello\n3,,"wor\nld"\n'
+    df = validate_str(rows_str, chunksize=chunksize, schema=typed_schema, return_frame=True)
+    assert df.dtypes.astype(str).tolist() == ["int64", "Int64", "object"]
+    assert df.to_dict(orient="list") == {
+        "intA": [1, 3],
+        "intB": [2, pd.NA],
+        "strC": ["hello", "wor\nld"],
+    }
+    with raises(ValueError, match="Value not castable to dtype='int64'"):
+        validate_str("x,2,hello\n", schema=typed_schema, return_frame=True)
+
+
+def test_validate_str_arrow():
+    """
+    Show that the validated frame may be handed back as an Arrow table of typed columns.
+    """
+    pa = importorskip("pyarrow")
+    table = validate_str("1,2,hello\n3,,world\n", schema=typed_schema, return_frame="arrow")
+    assert table.schema.types == [pa.int64(), pa.int64(), pa.string()]
+    assert table.column("intB").to_pylist() == [2, None]
@@ -1,51 +1,58 @@
 # From part 2 of https://github.com/dask/dask/issues/8045#issuecomment-902256015
 from __future__ import annotations
 import io
-import re
 import pandas as pd
 from pandas.errors import ParserError
 from pytest import mark, raises
 
-__all__ = ["sample_df", "validate_df", "validate_str"]
+from dialect_test import Dialect
+from pandas_nan_validation_test import quotechar_mask
+from schema_test import CsvSchema
+from validation_result_test import ValidationResult
+
+__all__ = ["sample_schema", "validate_df", "validate_str"]
 
 sample_header_bytestr = b"intA,intB,strC\n"
-sample_df = pd.read_csv(io.BytesIO(sample_header_bytestr))
+sample_schema = CsvSchema.from_head(sample_header_bytestr)
 
 
 def validate_df(
     df,
-    escapechar=r"\\",
-    quotechar='"',
-    doublequote=True,
-) -> None | list[dict[str, str]]:
+    dialect: Dialect = Dialect(),
+    return_rows=True,
+) -> list[dict[str, str]] | ValidationResult:
     """
     Validate that the DataFrame does not contain ``None`` values and does not have
-    ``quotechar`` characters within any field values. Arguments other than those below
-    are the same as those passed to :function:`pandas.read_csv` (``escapechar``,
-    ``quotechar``, ``doublequote``).
+    ``quotechar`` characters within any field values.
 
     Args:
-      df : (:class:`pd.DataFrame`) The DataFrame which can be iterated to give the
-           rows to be validated in the form of :class:`pd.Series` objects (one per row).
+      df          : (:class:`pd.DataFrame`) The DataFrame whose rows are to be validated.
+                    The checks are made on whole columns at once, and the first
+                    offending row is reported (as a :class:`dict`) in the error message.
+      dialect     : (:class:`Dialect`) The ``quotechar`` and ``escapechar`` to validate
+                    with (the same as those passed to :function:`pandas.read_csv`).
+      return_rows : Whether to print and return the validated rows, raising a
+                    :class:`ValueError` at the first invalid row, or else return a
+                    :class:`ValidationResult` (default: ``True``)
     """
-    n_matchable = 1 + int(doublequote)
-    # Regex to match an unescaped quotechar
-    re_patt_str = (
-        rf".*((?<!({escapechar}))({quotechar}))" + r"{1," + f"{n_matchable}" + r"}.*"
-    )
-    re_patt = re.compile(re_patt_str)
-    validated_rows = []
-    output = []
-    for row_idx, row_series in df.iterrows():
-        row = row_series.to_dict()
-        if any(
-            isinstance(v, float) and repr(v) == "nan"
-            for v in row.values()
-        ):
+    quotechar = dialect.quotechar
+    # Column-wise masks (one bool per row) rather than iterating rows of the DataFrame
+    absent_mask = df.isna().any(axis=1).to_numpy()
+    quoted_mask = quotechar_mask(df, dialect.quote_patt)
+    invalid_mask = absent_mask | quoted_mask
+    if invalid_mask.any():
+        row_pos = int(invalid_mask.argmax())  # Position of the first offending row
+        if not return_rows:
+            kind = "absent_field" if absent_mask[row_pos] else "quotechar"
+            return ValidationResult(row_pos, error_pos=row_pos, error_kind=kind)
+        row = df.iloc[row_pos].to_dict()
+        if absent_mask[row_pos]:
             raise ValueError(f"Absent field (incomplete row) at {row=}")
-        if any(isinstance(v, str) and re_patt.match(v) for v in row.values()):
-            raise ValueError(f"{quotechar=} found in {row=}")
-        validated_rows.append(row)
+        raise ValueError(f"{quotechar=} found in {row=}")
+    if not return_rows:
+        return ValidationResult(len(df))
+    validated_rows = df.to_dict(orient="records")
+    output = []
     print()
     for row in validated_rows:
         print(row)  # Only print rows if entire DataFrame validated
@@ -53,13 +60,20 @@ def validate_df(
     return output
 
 
-def validate_str(input_str, sample_colnames=sample_df.columns):
+def validate_str(input_str, schema: CsvSchema = sample_schema):
     """
-    Validate the string ``input_str`` whose column names (or index if no names) are
-    available through the ``sample_df`` DataFrame (sampled from the file's head).
+    Validate the string ``input_str`` whose column names and dialect are given by the
+    ``schema`` (inferred from the file's head).
     """
-    df = pd.read_csv(io.StringIO(input_str), names=sample_colnames)
-    return validate_df(df)
+    dialect = schema.dialect
+    df = pd.read_csv(
+        io.StringIO(input_str),
+        names=list(schema.names),
+        sep=dialect.delimiter,
+        quotechar=dialect.quotechar,
+        doublequote=dialect.doublequote,
+    )  # Not the escapechar: the escapes are left in the fields for the quotechar check
+    return validate_df(df, dialect=dialect)
 
 
 ### Tests begin here
@@ -109,7 +123,7 @@ def test_multiline_rows_str_open(rows_str, err_msg):
     still 'open' at the end of the string and causes a :class:`pd.errors.ParserError`.
     """
     with raises(ParserError, match=err_msg):
-        df = pd.read_csv(io.StringIO(rows_str), names=sample_df.columns)
+        df = pd.read_csv(io.StringIO(rows_str), names=list(sample_schema.names))
         # validated = validate_str(input_str=rows_str) # Don't need the full routine
 
 
@@ -139,7 +153,7 @@ def test_multiline_rows_str_backwards(rows_str_rev, err_msg):
     handled for the csv module (in `validate_rows_test.py`).
     """
     with raises(ValueError, match=err_msg):
-        validate_str(input_str=rows_str_rev, sample_colnames=sample_df.columns[::-1])
+        validate_str(input_str=rows_str_rev, schema=CsvSchema(sample_schema.names[::-1]))
 
 
 @mark.parametrize(
@@ -159,3 +173,18 @@ def test_absent_field_str(rows_str, err_msg):
    """
    with raises(ValueError, match=err_msg):
        validate_str(input_str=rows_str)
+
+
+@mark.parametrize("escapechar", ["\\", "/"])
+def test_escaped_quotechar_str(escapechar):
+    """
+    Show that an escaped quotechar (left escaped in the field value, as the parser is
+    not given the escapechar) is not reported as a quotechar in the field, whichever
+    escapechar the dialect has, but is reported in a dialect without an escapechar.
+    """
+    rows_str = f'1,2,a{escapechar}"b\n'
+    schema = CsvSchema(sample_schema.names, Dialect(escapechar=escapechar))
+    expected = [{"intA": 1, "intB": 2, "strC": f'a{escapechar}"b'}]
+    assert validate_str(rows_str, schema) == expected
+    with raises(ValueError, match="quotechar"):
+        validate_str(rows_str, CsvSchema(sample_schema.names, Dialect(escapechar=None)))
@@ -0,0 +1,180 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+import os
+from pandas.errors import ParserError
+from pytest import fixture, mark
+
+from dialect_test import Dialect
+from pandas_nan_validation_test import make_df, validate_df
+from schema_test import CsvSchema
+from validation_result_test import ValidationResult
+
+__all__ = ["validate_partition", "validate_partitions"]
+
+
+def validate_partition(
+    url: str,
+    start: int,
+    length: int,
+    n_columns: int | None = None,
+    sep: str = ",",
+    encoding="utf-8",
+    schema: CsvSchema | None = None,
+) -> ValidationResult:
+    """
+    Read only the byte range of a single partition of the file at ``url`` and validate
+    it with :func:`make_df` and :func:`validate_df`, returning a :class:`ValidationResult`
+    (in which ``n_bytes`` is the partition length if it is valid). The column names and
+    dialect are taken from the ``schema`` (a :class:`CsvSchema`) if given, and the
+    values checked against its dtype hints.
+    """
+    names = list(range(n_columns or 0)) if schema is None else list(schema.names)
+    dialect = Dialect(delimiter=sep) if schema is None else schema.dialect
+    if schema is not None:
+        n_columns = schema.n_cols
+    if length == 0:
+        return ValidationResult(0, 0)
+    with open(url, "rb") as f:
+        f.seek(start)
+        rows_str = f.read(length).decode(encoding)
+    try:
+        df = make_df(n_columns, rows_str, names=names, dialect=dialect)
+    except ParserError:
+        return ValidationResult(0, error_kind="parser_error")
+    result = validate_df(df, dialect=dialect, return_rows=False, schema=schema)
+    if result.valid:
+        result.n_bytes = length
+    return result
+
+
+def validate_partitions(
+    url: str,
+    store: dict[int, list],
+    n_columns: int | None = None,
+    sep: str = ",",
+    encoding="utf-8",
+    max_workers: int | None = None,
+    schema: CsvSchema | None = None,
+) -> dict[int, ValidationResult]:
+    """
+    Validate every partition in the ``store`` computed for the file at ``url`` (as by
+    :meth:`SingleCsvToPartitions.translate`), with each partition read and validated in
+    a separate process of a :class:`concurrent.futures.ProcessPoolExecutor`. The
+    partitions are sent to the workers in batches of about a quarter of each worker's
+    share, so a store of many small partitions does not pay the round trip to a worker
+    process once per partition.
+
+    Args:
+      store       : The partitions, as ``{offset: ["{{u}}", start, length]}`` where the
+                    ``"{{u}}"`` template refers to ``url`` (or else is another URL).
+      max_workers : The number of worker processes (default: the number of CPUs)
+      schema      : A :class:`CsvSchema` giving the column names, separator and dtype
+                    hints (pickled to each worker process along with its partition)
+
+    Returns:
+      A :class:`ValidationResult` per partition offset.
+    """
+    offsets = list(store)
+    urls = [url if u == "{{u}}" else u for u, _, _ in store.values()]
+    starts = [start for _, start, _ in store.values()]
+    lengths = [length for _, _, length in store.values()]
+    n = len(offsets)
+    workers = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        verdicts = executor.map(
+            validate_partition,
+            urls,
+            starts,
+            lengths,
+            [n_columns] * n,
+            [sep] * n,
+            [encoding] * n,
+            [schema] * n,
+            chunksize=max(1, n // (workers * 4)),
+        )
+        return dict(zip(offsets, verdicts))
+
+
+### Tests begin here
+
+multiline_dummy_text = """it\ts
+me\tlo
+uis\t:)
+hel\t"lo
+wor\tld"
+aga\tin...!
+"""
+
+
+@fixture
+def dummy_path(tmp_path):
+    file_path = tmp_path / "my_dummy_file.tsv"
+    file_path.write_text(multiline_dummy_text)
+    return file_path
+
+
+@mark.parametrize(
+    "store",
+    [
+        {0: ["{{u}}", 0, 11], 11: ["{{u}}", 11, 23], 34: ["{{u}}", 34, 11]},
+        {0: ["{{u}}", 0, 34], 34: ["{{u}}", 34, 11]},
+    ],
+)
+def test_valid_partitions(dummy_path, store):
+    """
+    Show that the partitions from ``offsets-calc-multiline-field.py`` are all valid,
+    with the number of columns and separator given by the schema of the file's head.
+    """
+    schema = CsvSchema.from_head(dummy_path.read_bytes(), Dialect(delimiter="\t"))
+    verdicts = validate_partitions(str(dummy_path), store, schema=schema)
+    assert list(verdicts) == list(store)
+    assert all(result.valid for result in verdicts.values())
+    assert [result.n_bytes for result in verdicts.values()] == [
+        length for _, _, length in store.values()
+    ]
+
+
+@mark.parametrize(
+    "store,expected",
+    [
+        (
+            {0: ["{{u}}", 0, 26], 26: ["{{u}}", 26, 19]},
+            {
+                0: ValidationResult(0, error_kind="parser_error"),
+                26: ValidationResult(0, error_pos=0, error_kind="quotechar"),
+            },
+        ),
+    ],
+)
+def test_invalid_partitions(dummy_path, store, expected):
+    """
+    Show that the non-row-terminating offset 26 (skipped in ``offsets-calc-multiline-field.py``)
+    gives two invalid partitions, the first for its open quote and the second for its
+    unescaped quotechar.
+    """
+    verdicts = validate_partitions(str(dummy_path), store, n_columns=2, sep="\t")
+    assert verdicts == expected
+
+
+def test_typed_partitions(tmp_path):
+    """
+    Show that with the dtype hints of a schema, a partition split inside a multiline
+    field is invalid at its first row (whose string values are in the integer columns),
+    a row earlier than without them (at the row with the closing quotechar, which has too
+    few fields).
+    """
+    file_bytes = b'1,"x\na,b,c\ny",2\n3,z,4\n'
+    file_path = tmp_path / "my_dummy_file.csv"
+    file_path.write_bytes(file_bytes)
+    schema = CsvSchema(("intA", "strB", "intC"), dtypes=("int64", None, "int64"))
+    untyped_schema = CsvSchema(schema.names)
+    store = {0: ["{{u}}", 0, 16], 16: ["{{u}}", 16, 6]}
+    verdicts = validate_partitions(str(file_path), store, schema=schema)
+    assert all(result.valid for result in verdicts.values())
+    misaligned = {5: ["{{u}}", 5, len(file_bytes) - 5]}
+    assert validate_partitions(str(file_path), misaligned, schema=schema) == {
+        5: ValidationResult(0, error_pos=0, error_kind="dtype")
+    }
+    assert validate_partitions(str(file_path), misaligned, schema=untyped_schema) == {
+        5: ValidationResult(1, error_pos=1, error_kind="absent_field")
+    }
@@ -0,0 +1,166 @@
+from __future__ import annotations
+import numpy as np
+from pytest import mark
+
+from dialect_test import Dialect, code_unit, encode_token
+from row_index_test import find_quoting
+
+__all__ = ["QuoteParityIndex"]
+
+
+class QuoteParityIndex:
+    """
+    A checkpoint array of the cumulative count of quotechars before every
+    ``checkpoint_bytes`` bytes of a CSV, built in one (NumPy) pass over the buffer. An
+    offset is inside a quoted field if an odd number of quotechars come before it, so
+    whether a lineterminator ends a row is answered by looking up the count at the
+    checkpoint before it and counting the quotechars in at most ``checkpoint_bytes``
+    bytes after that, rather than re-parsing (e.g. in reverse) any of the rows around it.
+    A doubled quotechar adds two to the count, leaving the parity unchanged. For UTF-16
+    or UTF-32 the ``checkpoint_bytes`` must be a multiple of the code unit.
+
+    Only the quotechars which could open or close a field are counted, as by
+    :func:`field_counts` (see :func:`find_quoting`): a stray quotechar within an unquoted
+    field is read literally, so does not change the parity. The escapechar escapes
+    nothing when the rows are parsed (see :class:`Dialect`), so is not looked at. A literal quotechar at the
+    end of an unquoted field (just before a delimiter) is still counted, which the
+    validators (unlike this index) go on to reject as a stray quotechar.
+
+    Attributes:
+      buf              : The bytes-like object indexed
+      checkpoint_bytes : The distance between checkpoints
+      counts           : The number of quotechars before each checkpoint
+    """
+
+    __slots__ = (
+        "buf",
+        "checkpoint_bytes",
+        "counts",
+        "_arr",
+        "_quote",
+        "_delimiter",
+        "_lineterminator",
+        "_unit",
+    )
+
+    def __init__(
+        self,
+        buf,
+        dialect: Dialect = Dialect(),
+        encoding="utf-8",
+        checkpoint_bytes: int = 4096,
+    ):
+        self._unit = unit = code_unit(encoding)
+        if checkpoint_bytes % unit:
+            raise ValueError(f"{checkpoint_bytes=} is not a multiple of the {encoding} code unit")
+        self.buf = buf
+        self.checkpoint_bytes = checkpoint_bytes
+        self._arr = np.frombuffer(buf, dtype=np.uint8)
+        self._quote = encode_token(dialect.quotechar, encoding)
+        self._delimiter = encode_token(dialect.delimiter, encoding)
+        self._lineterminator = encode_token(dialect.lineterminator, encoding)
+        checkpoints = np.arange(0, len(self._arr) + 1, checkpoint_bytes)
+        quote_pos = self._find_quotes(0, len(self._arr))
+        self.counts = np.searchsorted(quote_pos, checkpoints)
+
+    def _find_quotes(self, start: int, end: int) -> np.ndarray:
+        "The positions of the quotechars counted in ``buf[start:end]``."
+        args = (self._quote, self._delimiter, self._lineterminator, self._unit)
+        return find_quoting(self._arr, *args, start, end)
+
+    def quotes_before(self, offset: int) -> int:
+        "The number of quotechars before ``offset`` which open or close a field."
+        k = offset // self.checkpoint_bytes
+        checkpoint = k * self.checkpoint_bytes
+        local_quotes = self._find_quotes(checkpoint, offset)
+        return int(self.counts[k]) + len(local_quotes)
+
+    def in_quotes(self, offset: int) -> bool:
+        "Whether the byte at ``offset`` is inside a quoted field."
+        return self.quotes_before(offset) % 2 == 1
+
+    def is_row_terminating(self, term_offset: int) -> bool:
+        "Whether the lineterminator at ``term_offset`` ends a row (is not in quotes)."
+        return not self.in_quotes(term_offset)
+
+
+### Tests begin here
+
+multiline_dummy_bytes = b'it\ts\nme\tlo\nuis\t:)\nhel\t"lo\nwor\tld"\naga\tin...!\n'
+escaped_dummy_bytes = b'a,"b""c\n",d\n"e""f\ng",h\ni,\\"j\n'
+stray_dummy_bytes = b'a,b"c,d\n"e\nf",g"h\ni,j\n'
+doubled_dummy_bytes = b'a,"b""\nc",d\n"""e""",f\n'
+tsv_dialect = Dialect(delimiter="\t")
+
+
+def count_quotes_naively(buf: bytes, offset: int, dialect: Dialect = Dialect()) -> int:
+    """
+    Count the quotechars before ``offset`` which open or close a field (as told from
+    the bytes either side of the run of quotechars each is in) one byte at a time.
+    """
+    quotechar = dialect.quotechar.encode()
+    field_edges = (dialect.delimiter.encode(), dialect.lineterminator.encode())
+    quoting = []
+    i = 0
+    while i < len(buf):
+        if buf[i : i + 1] != quotechar:
+            i += 1
+            continue
+        j = i
+        while buf[j : j + 1] == quotechar:
+            j += 1
+        opens = i == 0 or buf[i - 1 : i] in field_edges
+        closes = j == len(buf) or buf[j : j + 1] in field_edges
+        if opens:
+            quoting.append(i)
+        if (j - i) % 2 == (0 if opens else 1) and (opens or closes):
+            quoting.append(j - 1)
+        i = j
+    return sum(pos < offset for pos in quoting)
+
+
+@mark.parametrize("checkpoint_bytes", [1, 2, 3, 7, 4096])
+@mark.parametrize(
+    "buf,dialect",
+    [
+        (multiline_dummy_bytes, tsv_dialect),
+        (escaped_dummy_bytes, Dialect()),
+        (stray_dummy_bytes, Dialect()),
+        (doubled_dummy_bytes, Dialect()),
+    ],
+)
+def test_quotes_before(buf, dialect, checkpoint_bytes):
+    """
+    Show that the count at every offset matches a byte by byte count, however the
+    checkpoints fall (including between a quotechar and the bytes beside it, or within
+    a run of quotechars).
+    """
+    index = QuoteParityIndex(buf, dialect, checkpoint_bytes=checkpoint_bytes)
+    for offset in range(len(buf) + 1):
+        assert index.quotes_before(offset) == count_quotes_naively(buf, offset, dialect)
+
+
+@mark.parametrize(
+    "buf,dialect,term_offsets,expected",
+    [
+        (
+            multiline_dummy_bytes,
+            tsv_dialect,
+            [4, 10, 17, 25, 33, 44],
+            [True, True, True, False, True, True],
+        ),
+        (escaped_dummy_bytes, Dialect(), [7, 11, 17, 22, 28], [False, True, False, True, True]),
+        (stray_dummy_bytes, Dialect(), [7, 10, 17, 21], [True, False, True, True]),
+        (doubled_dummy_bytes, Dialect(), [6, 11, 21], [False, True, True]),
+    ],
+)
+def test_is_row_terminating(buf, dialect, term_offsets, expected):
+    """
+    Show that the newline inside each multiline field (after a doubled quotechar,
+    including one doubled at the end of a line) is found not to end its row, while a
+    stray or escaped quotechar within an unquoted field (read literally, as by the
+    validators) does not open one.
+    """
+    index = QuoteParityIndex(buf, dialect, checkpoint_bytes=8)
+    assert [buf[t : t + 1] for t in term_offsets] == [b"\n"] * len(term_offsets)
+    assert [index.is_row_terminating(t) for t in term_offsets] == expected
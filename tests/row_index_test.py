@@ -0,0 +1,399 @@
+from __future__ import annotations
+from dataclasses import asdict
+import json
+import os
+from pathlib import Path
+import tracemalloc
+from typing import BinaryIO, Iterator
+import numpy as np
+from pytest import fixture, mark
+
+from byte_validation_test import find_all
+from dialect_test import Dialect, code_unit, encode_token
+
+__all__ = [
+    "find_quoting",
+    "token_at",
+    "scan_row_starts",
+    "iter_row_starts",
+    "build_row_index",
+    "load_row_index",
+    "row_index",
+    "partition_store",
+    "sidecar_path",
+]
+
+index_format = "csv-row-index"
+index_version = 1
+
+
+def token_at(arr: np.ndarray, pos: np.ndarray, token: bytes) -> np.ndarray:
+    "Whether ``token`` is found at each of the positions in the array of bytes."
+    found = (pos >= 0) & (pos + len(token) <= len(arr))
+    for k, byte in enumerate(token):
+        found &= arr[np.clip(pos + k, 0, max(len(arr) - 1, 0))] == byte
+    return found
+
+
+def find_quoting(
+    arr: np.ndarray,
+    quote: bytes,
+    delimiter: bytes,
+    lineterminator: bytes,
+    unit: int = 1,
+    start: int = 0,
+    end: int | None = None,
+    final=True,
+) -> np.ndarray:
+    """
+    Find the positions in ``arr[start:end]`` of the quotechars which open or close a
+    field, told apart from literal quotechars by the bytes either side of each run of
+    consecutive quotechars (as in :func:`field_counts`). A run just after a delimiter,
+    lineterminator, or the start of the array opens a field with its first quotechar,
+    and closes it with its last if the rest are odd in number (as a doubled quotechar is
+    a literal one). Any other run just before a delimiter, lineterminator or (if
+    ``final``) the end of the array closes a field with its last quotechar if there are
+    an odd number of them. Any other quotechar is within a field, so is read literally
+    by pandas. The bytes either side of the range (and the rest of any run of quotechars
+    it cuts) are looked at, so a range is searched as the whole array would be.
+    """
+    end = len(arr) if end is None else end
+    width = len(quote)
+    run_start, run_end = start, end
+    while run_start >= width and arr[run_start - width : run_start].tobytes() == quote:
+        run_start -= width
+    while arr[run_end : run_end + width].tobytes() == quote:
+        run_end += width
+    quote_pos = find_all(arr[run_start:run_end], quote, unit) + run_start
+    if len(quote_pos) == 0:
+        return quote_pos
+    gaps = np.diff(quote_pos) != width
+    firsts = quote_pos[np.concatenate([[True], gaps])]
+    lasts = quote_pos[np.concatenate([gaps, [True]])]
+    n_quotes = (lasts - firsts) // width + 1
+    opening = firsts == 0
+    closing = (lasts + width == len(arr)) & final
+    for token in (delimiter, lineterminator):
+        opening |= token_at(arr, firsts - len(token), token)
+        closing |= token_at(arr, lasts + width, token)
+    closing = np.where(opening, n_quotes % 2 == 0, closing & (n_quotes % 2 == 1))
+    quoting = np.sort(np.concatenate([firsts[opening], lasts[closing]]))
+    return quoting[(quoting >= start) & (quoting < end)]
+
+
+def scan_row_starts(buf, dialect: Dialect = Dialect(), encoding="utf-8") -> np.ndarray:
+    """
+    Find the offset of every row start in the CSV bytes ``buf`` in one pass: the offset
+    0 and the offset after each lineterminator which is not inside a quoted field. A
+    lineterminator is inside a quoted field if an odd number of the quotechars which
+    could open or close a field (see :func:`find_quoting`) come before it, so only the
+    quotechar positions are ever looked at outside of NumPy (a doubled quotechar adds
+    two, leaving the parity unchanged). The bytes are never decoded: the tokens are
+    encoded (and widened, for UTF-16 or UTF-32) instead, so the offsets are byte offsets
+    whatever the characters in the fields.
+
+    Returns:
+      The row start offsets as a sorted ``int64`` array, excluding the end of the file.
+    """
+    arr = np.frombuffer(buf, dtype=np.uint8)
+    if len(arr) == 0:
+        return np.zeros(0, dtype=np.int64)
+    unit = code_unit(encoding)
+    term = encode_token(dialect.lineterminator, encoding)
+    quote = encode_token(dialect.quotechar, encoding)
+    delimiter = encode_token(dialect.delimiter, encoding)
+    quote_pos = find_quoting(arr, quote, delimiter, term, unit)
+    term_pos = find_all(arr, term, unit)
+    terminating = np.searchsorted(quote_pos, term_pos) % 2 == 0
+    row_starts = term_pos[terminating] + len(term)
+    return np.concatenate([[0], row_starts[row_starts < len(arr)]]).astype(np.int64)
+
+
+def iter_row_starts(
+    f: BinaryIO,
+    dialect: Dialect = Dialect(),
+    encoding="utf-8",
+    chunk_bytes: int = 1 << 20,
+) -> Iterator[np.ndarray]:
+    """
+    Find the row starts of the CSV read from the binary file ``f`` as in
+    :func:`scan_row_starts`, but reading ``chunk_bytes`` at a time so that the memory
+    used is bounded by the chunk size rather than the file size. The parity of the
+    quotechars is carried across the edges of the chunks, and the last few bytes of each
+    are held back and scanned with the next chunk: those of a lineterminator (several
+    bytes long) or a run of quotechars which may continue in the next chunk, those
+    beside a quotechar which tell whether it opens or closes a field, and those of a
+    code unit (of UTF-16 or UTF-32) split by a chunk edge, so the chunks are scanned
+    from multiples of the code unit.
+
+    Yields:
+      An ``int64`` array of the row starts found in each chunk (beginning with 0, and
+      excluding the end of the file, so a row start at the end of a chunk is held back
+      until the next chunk is read).
+    """
+    unit = code_unit(encoding)
+    term = encode_token(dialect.lineterminator, encoding)
+    quote = encode_token(dialect.quotechar, encoding)
+    delimiter = encode_token(dialect.delimiter, encoding)
+    held = max(len(term), len(delimiter))  # The bytes either side of a quotechar looked at
+    data = b""  # The bytes not yet scanned, after up to ``held`` bytes already scanned
+    scan_from = 0  # The offset in ``data`` of the first byte not yet scanned
+    base = 0  # The file offset of the start of ``data``
+    in_quotes = False
+    pending = np.zeros(1, dtype=np.int64)  # Row starts which may be the end of the file
+    while True:
+        chunk = f.read(chunk_bytes)
+        data += chunk
+        if len(data) == scan_from:
+            return
+        arr = np.frombuffer(data, dtype=np.uint8)
+        if chunk:
+            cut = max(len(data) - held, scan_from)
+            cut -= cut % unit
+        else:
+            cut = len(data)
+        term_pos = find_all(arr[scan_from:], term, unit) + scan_from
+        term_pos = term_pos[term_pos < cut]
+        if len(term_pos):
+            cut = max(cut, int(term_pos[-1]) + len(term))
+        while chunk and cut > scan_from and data[cut - len(quote) : cut] == quote:
+            cut -= len(quote)  # Scan a run of quotechars (which may go on) all at once
+        quote_pos = find_quoting(arr, quote, delimiter, term, unit, scan_from, cut, not chunk)
+        quotes_before = np.searchsorted(quote_pos, term_pos) + in_quotes
+        row_starts = base + term_pos[quotes_before % 2 == 0] + len(term)
+        in_quotes = (len(quote_pos) + in_quotes) % 2 == 1
+        kept = max(cut - held, 0)
+        data = data[kept:]
+        base += kept
+        scan_from = cut - kept
+        row_starts = np.concatenate([pending, row_starts]).astype(np.int64)
+        pending = row_starts[row_starts == base + scan_from]
+        if len(row_starts) > len(pending):
+            yield row_starts[row_starts < base + scan_from]
+
+
+def sidecar_path(path) -> Path:
+    "The path of the row index sidecar file written next to the CSV at ``path``."
+    path = Path(path)
+    return path.with_name(path.name + ".rowidx")
+
+
+def index_header(path, dialect: Dialect, encoding: str) -> dict:
+    """
+    The header keying a row index to the CSV it was scanned from: the file's size and
+    modification time (so an index of an overwritten file is never used), and the
+    dialect and encoding the rows were split with.
+    """
+    stat = os.stat(path)
+    return {
+        "format": index_format,
+        "version": index_version,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "dialect": asdict(dialect),
+        "encoding": encoding,
+    }
+
+
+def build_row_index(
+    path, dialect: Dialect = Dialect(), encoding="utf-8", chunk_bytes: int = 1 << 24
+) -> np.ndarray:
+    """
+    Scan the CSV at ``path`` for its row starts, reading ``chunk_bytes`` at a time with
+    :func:`iter_row_starts` (so the memory used is bounded by the chunk size and the
+    number of rows, not the file size), and write them to the sidecar file, as a JSON
+    header line followed by the differences between consecutive row starts in the
+    narrowest little-endian unsigned integer type which fits them all (at most
+    ``uint64``). The sidecar is written to a temporary file then renamed, so a
+    concurrent reader never sees a partly written index.
+
+    Returns:
+      The row start offsets (as from :func:`scan_row_starts`).
+    """
+    header = index_header(path, dialect, encoding)
+    with open(path, "rb") as f:
+        chunk_starts = list(iter_row_starts(f, dialect, encoding, chunk_bytes))
+    row_starts = np.concatenate([np.zeros(0, dtype=np.int64), *chunk_starts])
+    deltas = np.diff(row_starts, prepend=0)
+    dtype = np.min_scalar_type(int(deltas.max()) if len(deltas) else 0).newbyteorder("<")
+    header.update(dtype=dtype.str, n_rows=len(row_starts))
+    out_path = sidecar_path(path)
+    tmp_path = out_path.with_name(out_path.name + f".{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(json.dumps(header).encode() + b"\n")
+        f.write(deltas.astype(dtype).tobytes())
+    os.replace(tmp_path, out_path)
+    return row_starts
+
+
+def load_row_index(path, dialect: Dialect = Dialect(), encoding="utf-8") -> np.ndarray | None:
+    """
+    Read the row starts from the sidecar of the CSV at ``path``, without reading the
+    CSV itself.
+
+    Returns:
+      The row start offsets, or ``None`` if there is no sidecar or it is stale (the CSV
+      has changed size or modification time, or was indexed with another dialect).
+    """
+    try:
+        with open(sidecar_path(path), "rb") as f:
+            header = json.loads(f.readline())
+            data = f.read()
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    expected = index_header(path, dialect, encoding)
+    if any(header.get(key) != value for key, value in expected.items()):
+        return None
+    deltas = np.frombuffer(data, dtype=np.dtype(header["dtype"]))
+    if len(deltas) != header["n_rows"]:
+        return None
+    return deltas.cumsum(dtype=np.uint64).astype(np.int64)
+
+
+def row_index(path, dialect: Dialect = Dialect(), encoding="utf-8") -> np.ndarray:
+    """
+    Get the row starts of the CSV at ``path`` from its sidecar, scanning the CSV (and
+    writing the sidecar) only if there is no up to date sidecar.
+    """
+    row_starts = load_row_index(path, dialect, encoding)
+    if row_starts is None:
+        row_starts = build_row_index(path, dialect, encoding)
+    return row_starts
+
+
+def partition_store(row_starts: np.ndarray, size: int, blocksize: int) -> dict[int, list]:
+    """
+    Compute the partitions ``store`` for a blocksize (in the format of
+    :meth:`SingleCsvToPartitions.translate`) by binary search of the row starts: each
+    multiple of the blocksize is moved forward to the next row start, skipping duplicate
+    and end of file offsets.
+    """
+    bounds = np.append(row_starts, size)
+    guesses = np.arange(0, size, blocksize)
+    offsets = np.unique(bounds[np.searchsorted(bounds, guesses)])
+    offsets = offsets[offsets < size].tolist()
+    return {
+        start: ["{{u}}", start, end - start]
+        for start, end in zip(offsets, [*offsets[1:], size])
+    }
+
+
+### Tests begin here
+
+simple_dummy_bytes = b"it\ts\nme\tlo\nuis\t:)\nhel\tlo\nwor\tld\naga\tin...!\n"
+multiline_dummy_bytes = b'it\ts\nme\tlo\nuis\t:)\nhel\t"lo\nwor\tld"\naga\tin...!\n'
+tsv_dialect = Dialect(delimiter="\t")
+
+
+@fixture
+def dummy_path(tmp_path):
+    return tmp_path / "my_dummy_file.tsv"
+
+
+@mark.parametrize(
+    "file_bytes,dialect,expected",
+    [
+        (simple_dummy_bytes, tsv_dialect, [0, 5, 11, 18, 25, 32]),
+        (multiline_dummy_bytes, tsv_dialect, [0, 5, 11, 18, 34]),
+        (b'a,b\n"c\\"\n",d\n', Dialect(), [0, 4, 9]),
+        (b'a,b\n"c""\n",d\n', Dialect(), [0, 4]),
+        (b'a,b"c\nd,e\n', Dialect(), [0, 6]),
+        (b"", Dialect(), []),
+    ],
+)
+def test_scan_row_starts(file_bytes, dialect, expected):
+    """
+    Show that lineterminators in quoted fields (including after a doubled quotechar) do
+    not start a row, but those after a quotechar closing a field (even if just after an
+    escapechar, which escapes nothing when parsing) or a stray quotechar do.
+    """
+    assert scan_row_starts(file_bytes, dialect).tolist() == expected
+
+
+@mark.parametrize("encoding", ["utf-8", "utf-16-le", "utf-16-be", "utf-32-be"])
+def test_scan_encoded_row_starts(encoding):
+    """
+    Show that the row starts of multibyte text are its byte offsets, and that a newline
+    byte straddling two UTF-16 code units (in the first field of the last row) is not
+    mistaken for a lineterminator.
+    """
+    rows = ["it\tś\n", 'mé\t"l\no"\n', "\u0a41\u0100\u0a41\t€\n"]
+    encoded_rows = [row.encode(encoding) for row in rows]
+    expected = np.cumsum([0] + [len(row) for row in encoded_rows[:-1]]).tolist()
+    file_bytes = b"".join(encoded_rows)
+    assert scan_row_starts(file_bytes, tsv_dialect, encoding).tolist() == expected
+
+
+@mark.parametrize(
+    "file_bytes,blocksize,expected",
+    [
+        (
+            simple_dummy_bytes,
+            10,
+            {0: ["{{u}}", 0, 11], 11: ["{{u}}", 11, 14], 25: ["{{u}}", 25, 7], 32: ["{{u}}", 32, 11]},
+        ),
+        (
+            simple_dummy_bytes,
+            5,
+            {
+                0: ["{{u}}", 0, 5],
+                5: ["{{u}}", 5, 6],
+                11: ["{{u}}", 11, 7],
+                18: ["{{u}}", 18, 7],
+                25: ["{{u}}", 25, 7],
+                32: ["{{u}}", 32, 11],
+            },
+        ),
+        (simple_dummy_bytes, 20, {0: ["{{u}}", 0, 25], 25: ["{{u}}", 25, 18]}),
+        (
+            multiline_dummy_bytes,
+            10,
+            {0: ["{{u}}", 0, 11], 11: ["{{u}}", 11, 23], 34: ["{{u}}", 34, 11]},
+        ),
+        (multiline_dummy_bytes, 20, {0: ["{{u}}", 0, 34], 34: ["{{u}}", 34, 11]}),
+    ],
+)
+def test_partition_store(dummy_path, file_bytes, blocksize, expected):
+    """
+    Show that the stores of ``offsets-calc*.py`` are reproduced from the row index alone.
+    """
+    dummy_path.write_bytes(file_bytes)
+    row_starts = row_index(dummy_path, tsv_dialect)
+    assert partition_store(row_starts, len(file_bytes), blocksize) == expected
+
+
+def test_build_row_index_chunked(dummy_path):
+    """
+    Show that the sidecar built a chunk at a time (here with multiline fields, doubled
+    quotechars and stray quotechars split across the chunks) holds the row starts of a single scan,
+    while the memory used is bounded by the chunk size rather than the file size.
+    """
+    rows = [b'a,"b\nc",d\n', b'e,"f""\ng",h\n', b'i,j\\"k,' + b"l" * 5000 + b"\n"]
+    file_bytes = b"".join(rows) * 200
+    dummy_path.write_bytes(file_bytes)
+    chunk_bytes = 1 << 12
+    tracemalloc.start()
+    try:
+        built = build_row_index(dummy_path, chunk_bytes=chunk_bytes)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert built.tolist() == scan_row_starts(file_bytes).tolist()
+    assert load_row_index(dummy_path).tolist() == built.tolist()
+    assert peak < 64 * chunk_bytes < len(file_bytes)
+
+
+def test_sidecar_reused(dummy_path):
+    """
+    Show that the sidecar is read back in place of rescanning, but not once the CSV is
+    overwritten or if asked for with another dialect.
+    """
+    dummy_path.write_bytes(multiline_dummy_bytes)
+    assert load_row_index(dummy_path, tsv_dialect) is None
+    built = build_row_index(dummy_path, tsv_dialect)
+    assert sidecar_path(dummy_path).exists()
+    assert load_row_index(dummy_path, tsv_dialect).tolist() == built.tolist()
+    assert load_row_index(dummy_path, Dialect()) is None
+    dummy_path.write_bytes(simple_dummy_bytes)
+    assert load_row_index(dummy_path, tsv_dialect) is None
+    assert row_index(dummy_path, tsv_dialect).tolist() == [0, 5, 11, 18, 25, 32]
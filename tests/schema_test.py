@@ -0,0 +1,139 @@
+from __future__ import annotations
+import csv
+from dataclasses import dataclass
+from functools import lru_cache
+import io
+import pickle
+from pytest import mark
+
+from dialect_test import Dialect
+
+try:
+    import fsspec
+except ImportError:
+    fsspec = None
+
+__all__ = ["CsvSchema", "schema_for_url"]
+
+
+@dataclass(frozen=True)
+class CsvSchema:
+    """
+    What is known of a CSV from its head, inferred once and then given to the validators
+    of each of its partitions in place of re-reading the header: the column names, the
+    dialect, and optional per-column dtype hints (aligned with the names, ``None`` where
+    there is no hint). Instances are hashable and small to pickle (to send to workers).
+    """
+
+    names: tuple
+    dialect: Dialect = Dialect()
+    dtypes: tuple[str | None, ...] = ()
+
+    @property
+    def n_cols(self) -> int:
+        return len(self.names)
+
+    def dtype_map(self) -> dict[str, str]:
+        "The dtype hints as the ``dtype`` argument of :function:`pandas.read_csv`."
+        return {name: dtype for name, dtype in zip(self.names, self.dtypes) if dtype}
+
+    @classmethod
+    def from_head(
+        cls,
+        head: bytes,
+        dialect: Dialect = Dialect(),
+        encoding="utf-8",
+        dtypes: dict[str, str] | None = None,
+        header=True,
+    ) -> CsvSchema:
+        """
+        Infer the schema from the head of a CSV (at least its first row) by reading just
+        its first row with the csv module, rather than parsing it into a DataFrame.
+
+        Args:
+          dtypes : The dtype hints, by column name
+          header : Whether the first row is a header row (default: ``True``), else the
+                   columns are named by their position (as with ``header=None`` in
+                   :function:`pandas.read_csv`)
+        """
+        text = head.decode(encoding, errors="ignore")  # The head may end mid-character
+        r = csv.reader(
+            io.StringIO(text, newline=""),
+            delimiter=dialect.delimiter,
+            quotechar=dialect.quotechar,
+            doublequote=dialect.doublequote,
+        )
+        first_row = next(r, [])
+        names = tuple(first_row) if header else tuple(range(len(first_row)))
+        dtypes = dtypes or {}
+        hints = tuple(dtypes.get(name) for name in names) if dtypes else ()
+        return cls(names, dialect, hints)
+
+
+@lru_cache(maxsize=128)
+def schema_for_url(
+    url: str,
+    dialect: Dialect = Dialect(),
+    encoding="utf-8",
+    head_bytes: int = 65536,
+) -> CsvSchema:
+    """
+    Infer the schema of the CSV at ``url`` from its first ``head_bytes`` bytes, read
+    with fsspec if it is installed (so ``url`` may be remote) or else from the local
+    filesystem. The schema of the most recently used URLs are cached, so the head of a
+    file is only read once however many partitions of it are validated (call
+    ``schema_for_url.cache_clear()`` if a file's header is changed).
+    """
+    if fsspec is None:
+        with open(url, "rb") as f:
+            head = f.read(head_bytes)
+    else:
+        with fsspec.open(url, "rb") as f:
+            head = f.read(head_bytes)
+    return CsvSchema.from_head(head, dialect, encoding)
+
+
+### Tests begin here
+
+
+@mark.parametrize(
+    "head,dialect,header,expected",
+    [
+        (b"intA,intB,strC\n1,2,", Dialect(), True, ("intA", "intB", "strC")),
+        (b'it\t"s\tx"\nme\tlo\n', Dialect(delimiter="\t"), True, ("it", "s\tx")),
+        (b"it\ts\nme\tlo\n", Dialect(delimiter="\t"), False, (0, 1)),
+        (b"", Dialect(), True, ()),
+    ],
+)
+def test_from_head(head, dialect, header, expected):
+    """
+    Show that the names are read from the first row only (including a quoted name with
+    a delimiter in it), and that the schema survives pickling.
+    """
+    schema = CsvSchema.from_head(head, dialect, header=header)
+    assert schema.names == expected
+    assert schema.n_cols == len(expected)
+    assert pickle.loads(pickle.dumps(schema)) == schema
+
+
+def test_dtype_hints():
+    """
+    Show that dtype hints are aligned to the names, for the columns given hints only.
+    """
+    schema = CsvSchema.from_head(b"intA,intB,strC\n", dtypes={"intB": "int64"})
+    assert schema.dtypes == (None, "int64", None)
+    assert schema.dtype_map() == {"intB": "int64"}
+
+
+def test_schema_for_url_cached(tmp_path):
+    """
+    Show that the head of a file is only read for the first schema requested of it.
+    """
+    file_path = tmp_path / "my_dummy_file.csv"
+    file_path.write_bytes(b"intA,intB,strC\n1,2,hello\n")
+    schema_for_url.cache_clear()
+    schema = schema_for_url(str(file_path))
+    assert schema.names == ("intA", "intB", "strC")
+    file_path.write_bytes(b"a,b\n")
+    assert schema_for_url(str(file_path)) is schema
+    assert schema_for_url.cache_info().hits == 1
@@ -0,0 +1,178 @@
+from __future__ import annotations
+import os
+import random
+import tracemalloc
+from typing import BinaryIO, Iterator
+import numpy as np
+from pytest import fixture, mark
+
+from dialect_test import Dialect
+from row_index_test import iter_row_starts, scan_row_starts
+
+__all__ = ["iter_partitions", "stream_partitions"]
+
+
+def iter_partitions(
+    f: BinaryIO,
+    blocksize: int,
+    url: str = "{{u}}",
+    dialect: Dialect = Dialect(),
+    encoding="utf-8",
+    chunk_bytes: int = 1 << 20,
+) -> Iterator[tuple[int, list]]:
+    """
+    Stream the partitions of the CSV read from the binary file ``f`` in the ``store``
+    format of :meth:`SingleCsvToPartitions.translate`, as each is found. A row start is
+    the start of a partition if a multiple of the blocksize falls after the previous row
+    start and at or before it (so that each multiple of the blocksize is moved forward
+    to the next row start, skipping duplicates), which is decided a chunk at a time.
+
+    Yields:
+      The partition offset and its ``[url, start, length]``, in order.
+    """
+    prev_start = -1
+    part_start = None
+    for row_starts in iter_row_starts(f, dialect, encoding, chunk_bytes):
+        prev_starts = np.concatenate([[prev_start], row_starts[:-1]])
+        is_part_start = (row_starts // blocksize > prev_starts // blocksize) | (prev_starts < 0)
+        for start in row_starts[is_part_start].tolist():
+            if part_start is not None:
+                yield part_start, [url, part_start, start - part_start]
+            part_start = start
+        prev_start = int(row_starts[-1])
+    size = f.tell()
+    if part_start is not None and part_start < size:
+        yield part_start, [url, part_start, size - part_start]
+
+
+def stream_partitions(
+    path,
+    blocksize: int,
+    url: str = "{{u}}",
+    dialect: Dialect = Dialect(),
+    encoding="utf-8",
+    chunk_bytes: int = 1 << 20,
+) -> dict[int, list]:
+    """
+    Compute the partitions ``store`` of the CSV file at ``path`` by :func:`iter_partitions`,
+    reading it in binary chunks of ``chunk_bytes``.
+    """
+    with open(path, "rb") as f:
+        return dict(iter_partitions(f, blocksize, url, dialect, encoding, chunk_bytes))
+
+
+### Tests begin here
+
+simple_dummy_bytes = b"it\ts\nme\tlo\nuis\t:)\nhel\tlo\nwor\tld\naga\tin...!\n"
+multiline_dummy_bytes = b'it\ts\nme\tlo\nuis\t:)\nhel\t"lo\nwor\tld"\naga\tin...!\n'
+tsv_dialect = Dialect(delimiter="\t")
+n_stream_bytes = int(os.environ.get("CSV_STREAM_BYTES", 1 << 23))
+
+
+def generate_multiline_csv(n_rows: int, lineterminator: str = "\n", seed=0) -> bytes:
+    """
+    Generate CSV rows whose fields may be quoted, multiline, and have escaped or doubled
+    quotechars, with a seeded random number generator.
+    """
+    rng = random.Random(seed)
+    fields = ["abc", '"d\ne"', '"f""g"', '"h\\"i"', 'j\\"k', '"l\n\nm"', ""]
+    rows = [",".join(rng.choices(fields, k=3)) for _ in range(n_rows)]
+    return (lineterminator.join(rows) + lineterminator).encode()
+
+
+@fixture
+def dummy_path(tmp_path):
+    return tmp_path / "my_dummy_file.tsv"
+
+
+@mark.parametrize("chunk_bytes", [1, 3, 7, 1 << 20])
+@mark.parametrize(
+    "file_bytes,blocksize,expected",
+    [
+        (
+            simple_dummy_bytes,
+            10,
+            {0: ["{{u}}", 0, 11], 11: ["{{u}}", 11, 14], 25: ["{{u}}", 25, 7], 32: ["{{u}}", 32, 11]},
+        ),
+        (
+            simple_dummy_bytes,
+            5,
+            {
+                0: ["{{u}}", 0, 5],
+                5: ["{{u}}", 5, 6],
+                11: ["{{u}}", 11, 7],
+                18: ["{{u}}", 18, 7],
+                25: ["{{u}}", 25, 7],
+                32: ["{{u}}", 32, 11],
+            },
+        ),
+        (simple_dummy_bytes, 20, {0: ["{{u}}", 0, 25], 25: ["{{u}}", 25, 18]}),
+        (
+            multiline_dummy_bytes,
+            5,
+            {
+                0: ["{{u}}", 0, 5],
+                5: ["{{u}}", 5, 6],
+                11: ["{{u}}", 11, 7],
+                18: ["{{u}}", 18, 16],
+                34: ["{{u}}", 34, 11],
+            },
+        ),
+        (
+            multiline_dummy_bytes,
+            10,
+            {0: ["{{u}}", 0, 11], 11: ["{{u}}", 11, 23], 34: ["{{u}}", 34, 11]},
+        ),
+        (multiline_dummy_bytes, 20, {0: ["{{u}}", 0, 34], 34: ["{{u}}", 34, 11]}),
+        (b"", 10, {}),
+    ],
+)
+def test_stream_partitions(dummy_path, file_bytes, blocksize, expected, chunk_bytes):
+    """
+    Show that the stores of ``offsets-calc*.py`` are reproduced however small the chunks
+    the file is read in.
+    """
+    dummy_path.write_bytes(file_bytes)
+    store = stream_partitions(dummy_path, blocksize, dialect=tsv_dialect, chunk_bytes=chunk_bytes)
+    assert store == expected
+
+
+@mark.parametrize("encoding", ["utf-8", "utf-16-le", "utf-32-be"])
+@mark.parametrize("chunk_bytes", [1, 2, 5, 64])
+@mark.parametrize("lineterminator", ["\n", "\r\n"])
+def test_chunked_row_starts(dummy_path, chunk_bytes, lineterminator, encoding):
+    """
+    Show that the row starts found a chunk at a time are those found all at once, with
+    quoted fields, escapechars, lineterminators and (UTF-16 or UTF-32) code units split
+    across the chunk edges.
+    """
+    file_bytes = generate_multiline_csv(200, lineterminator).decode().encode(encoding)
+    dialect = Dialect(lineterminator=lineterminator)
+    with open(dummy_path.with_suffix(".csv"), "wb") as f:
+        f.write(file_bytes)
+    with open(dummy_path.with_suffix(".csv"), "rb") as f:
+        row_starts = iter_row_starts(f, dialect, encoding, chunk_bytes=chunk_bytes)
+        chunked = np.concatenate(list(row_starts))
+    assert chunked.tolist() == scan_row_starts(file_bytes, dialect, encoding).tolist()
+
+
+def test_stream_memory_bounded(tmp_path):
+    """
+    Show that the memory used while partitioning a file (of ``CSV_STREAM_BYTES``, 8 MiB
+    by default) is bounded by the chunk size, not the file size.
+    """
+    file_path = tmp_path / "large.csv"
+    block = generate_multiline_csv(5000)
+    with open(file_path, "wb") as f:
+        for _ in range(n_stream_bytes // len(block) + 1):
+            f.write(block)
+    chunk_bytes = 1 << 16
+    tracemalloc.start()
+    try:
+        with open(file_path, "rb") as f:
+            for _ in iter_partitions(f, blocksize=1 << 20, chunk_bytes=chunk_bytes):
+                pass
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < 64 * chunk_bytes < n_stream_bytes
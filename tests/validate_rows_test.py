@@ -2,50 +2,69 @@
 from __future__ import annotations
 import csv
 import io
-import re
-import pandas as pd
 from pytest import mark, raises
 
+from dialect_test import Dialect
+from schema_test import CsvSchema
+from validation_result_test import ValidationResult
+
 __all__ = ["reader", "validate_dictreader", "validate_str"]
 
 sample_header_bytestr = b"intA,intB,strC\n"
-sample_df = pd.read_csv(io.BytesIO(sample_header_bytestr))
+sample_schema = CsvSchema.from_head(sample_header_bytestr)
 
 
-def reader(input_str, df_colnames=sample_df.columns):
+def reader(input_str, schema: CsvSchema = sample_schema):
     """
     Args:
       input_str : The string to load into a new :class:`io.StringIO` buffer to create
                   the DictReader from
-      df        : The DataFrame whose columns give the fieldnames fro the DictReader
+      schema    : The schema whose names give the fieldnames for the DictReader, and
+                  whose dialect it reads with (except the escapechar, which is left in
+                  the field values so that an escaped quotechar is not reported)
     """
     buf = io.StringIO(input_str)
-    return csv.DictReader(buf, fieldnames=df_colnames)
+    dialect = schema.dialect
+    return csv.DictReader(
+        buf,
+        fieldnames=schema.names,
+        delimiter=dialect.delimiter,
+        quotechar=dialect.quotechar,
+        doublequote=dialect.doublequote,
+    )  # Not the escapechar: the escapes are left in the fields for the quotechar check
 
 
 def validate_dictreader(
     r,
-    escapechar=r"\\",
-    quotechar='"',
-    doublequote=True,
+    dialect: Dialect = Dialect(),
     printout=False,
-) -> None | list[dict[str, str]]:
+    return_rows=True,
+) -> None | list[dict[str, str]] | ValidationResult:
     """
     Args:
-      r : (:class:`csv.DictReader`) The DictReader which can be iterated to give the rows to be validated
-          in the form of :class:`dict` objects (one per row).
-    """
-    n_matchable = 1 + int(doublequote)
-    re_patt_str = (
-        rf".*((?<!({escapechar}))({quotechar}))" + r"{1," + f"{n_matchable}" + r"}.*"
-    )
-    re_patt = re.compile(re_patt_str)
+      r           : (:class:`csv.DictReader`) The DictReader which can be iterated to give the rows to be validated
+                    in the form of :class:`dict` objects (one per row).
+      dialect     : (:class:`Dialect`) The ``quotechar`` and ``escapechar`` to validate with
+      return_rows : Whether to return (or print) the validated rows, raising a :class:`ValueError`
+                    at the first invalid row, or else count them into a :class:`ValidationResult`
+    """
+    quotechar = dialect.quotechar
+    re_patt = dialect.quote_patt
+    if not return_rows:
+        n_rows = 0
+        for row in r:
+            if None in row.values():
+                return ValidationResult(n_rows, error_pos=n_rows, error_kind="absent_field")
+            if any(re_patt.search(v) for v in row.values()):
+                return ValidationResult(n_rows, error_pos=n_rows, error_kind="quotechar")
+            n_rows += 1
+        return ValidationResult(n_rows)
     validated_rows = []
     output = []
     for row in r:
         if None in row.values():
             raise ValueError(f"Absent field (incomplete row) at {row=}")
-        if any(re_patt.match(v) for v in row.values()):
+        if any(re_patt.search(v) for v in row.values()):
             raise ValueError(f"{quotechar=} found in {row=}")
         validated_rows.append(row)
     for row in validated_rows:
@@ -56,13 +75,13 @@ def validate_dictreader(
     return None if printout else output
 
 
-def validate_str(input_str, sample_df=sample_df):
+def validate_str(input_str, schema: CsvSchema = sample_schema):
     """
-    Validate the string ``input_str`` whose column names (or index if no names) are
-    available through the ``sample_df`` DataFrame (sampled from the file's head).
+    Validate the string ``input_str`` whose column names and dialect are given by the
+    ``schema`` (inferred from the file's head).
     """
-    r = reader(input_str, df_colnames=sample_df.columns)
-    return validate_dictreader(r)
+    r = reader(input_str, schema=schema)
+    return validate_dictreader(r, dialect=schema.dialect)
 
 
 ### Tests begin here
@@ -134,3 +153,33 @@ def test_absent_field_str(rows_str, err_msg):
     """
     with raises(ValueError, match=err_msg):
         validate_str(input_str=rows_str)
+
+
+@mark.parametrize(
+    "rows_str,expected",
+    [
+        ("1,2,hello\n3,4,world\n", ValidationResult(2)),
+        ('hello,world,etc\nfoo"\netc,etc,etc\n', ValidationResult(1, None, 1, "absent_field")),
+    ],
+)
+def test_dictreader_result(rows_str, expected):
+    """
+    Show that without returning the rows, the number of rows validated and the position of
+    the first invalid row are given in a :class:`ValidationResult`.
+    """
+    assert validate_dictreader(reader(rows_str), return_rows=False) == expected
+
+
+@mark.parametrize("escapechar", ["\\", "/"])
+def test_escaped_quotechar_str(escapechar):
+    """
+    Show that an escaped quotechar (left escaped in the field value, as the reader is
+    not given the escapechar) is not reported as a quotechar in the field, whichever
+    escapechar the dialect has, but is reported in a dialect without an escapechar.
+    """
+    rows_str = f'1,2,a{escapechar}"b\n'
+    schema = CsvSchema(sample_schema.names, Dialect(escapechar=escapechar))
+    expected = [{"intA": "1", "intB": "2", "strC": f'a{escapechar}"b'}]
+    assert validate_str(rows_str, schema) == expected
+    with raises(ValueError, match="quotechar"):
+        validate_str(rows_str, CsvSchema(sample_schema.names, Dialect(escapechar=None)))
@@ -0,0 +1,158 @@
+from __future__ import annotations
+from contextlib import redirect_stdout
+import csv
+import io
+import os
+import random
+import string
+import tracemalloc
+import pandas as pd
+import pytest
+from pytest import mark
+
+from boundary_resolution_test import resolve_boundary
+from byte_validation_test import validate_bytes
+from pandas_nan_validation_test import make_df, validate_df
+from pandas_validate_rows_test import validate_df as validate_c_df
+from validate_rows_test import validate_dictreader
+
+pytest.importorskip("pytest_benchmark")
+
+__all__ = ["generate_csv", "split_blocks"]
+
+n_bench_rows = int(os.environ.get("CSV_BENCH_ROWS", 2000))
+run_benchmarks = os.environ.get("CSV_BENCH", "0") != "0"  # Opt in with CSV_BENCH=1
+
+
+def generate_csv(
+    n_rows: int,
+    n_cols: int,
+    multiline_density: float = 0.0,
+    quote_density: float = 0.0,
+    field_width: int = 8,
+    seed: int = 0,
+) -> bytes:
+    """
+    Generate a (header-less) CSV whose fields are random words, some of which are quoted.
+    Every row is valid, so every validator should accept every block of it.
+
+    Args:
+      multiline_density : The fraction of fields which are quoted and contain newlines
+      quote_density     : The fraction of fields which are quoted and contain delimiters
+      field_width       : The mean number of characters in a field value
+      seed              : The seed for the random number generator (default: 0)
+    """
+    rng = random.Random(seed)
+    # Without "n" or "N" no value can be in pandas' default NA values ("nan", "NULL", etc.)
+    alphabet = (string.ascii_letters + string.digits).replace("n", "").replace("N", "")
+
+    def field() -> str:
+        value = "".join(rng.choices(alphabet, k=rng.randint(1, 2 * field_width - 1)))
+        draw = rng.random()
+        if draw < multiline_density:
+            return f'"{value[: len(value) // 2]}\n{value[len(value) // 2 :]}"'
+        if draw < multiline_density + quote_density:
+            return f'"{value[: len(value) // 2]},{value[len(value) // 2 :]}"'
+        return value
+
+    rows = (",".join(field() for _ in range(n_cols)) for _ in range(n_rows))
+    return "".join(f"{row}\n" for row in rows).encode()
+
+
+def split_blocks(buf: bytes, n_cols: int, blocksize: int) -> list[tuple[int, int]]:
+    """
+    Split the buffer into ``(start, end)`` blocks at the row starts resolved from each
+    multiple of the blocksize.
+    """
+    guesses = range(0, len(buf), blocksize)
+    offsets = sorted({resolve_boundary(buf, g, n_cols) for g in guesses} - {len(buf)})
+    return list(zip(offsets, [*offsets[1:], len(buf)]))
+
+
+def validate_with_dictreader(buf, start, end, n_cols):
+    r = csv.DictReader(io.StringIO(buf[start:end].decode()), fieldnames=range(n_cols))
+    validate_dictreader(r)
+
+
+def validate_with_c_engine(buf, start, end, n_cols):
+    df = pd.read_csv(io.BytesIO(buf[start:end]), names=range(n_cols))
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        validate_c_df(df)  # This prints every row
+
+
+def validate_with_python_engine(buf, start, end, n_cols):
+    rows_str = buf[start:end].decode()
+    df = make_df(n_cols, rows_str, names=list(range(n_cols)), engine="python")
+    validate_df(df, verbose=False)
+
+
+def validate_with_str_c_engine(buf, start, end, n_cols):
+    df = make_df(n_cols, buf[start:end].decode(), names=list(range(n_cols)))
+    validate_df(df, verbose=False)
+
+
+def validate_with_bytes(buf, start, end, n_cols):
+    assert validate_bytes(buf, n_cols, start=start, end=end).valid
+
+
+validators = {
+    "dictreader": validate_with_dictreader,
+    "pandas_c": validate_with_c_engine,
+    "pandas_python": validate_with_python_engine,
+    "pandas_c_str": validate_with_str_c_engine,
+    "bytes": validate_with_bytes,
+}
+
+csv_shapes = {
+    "narrow": dict(n_cols=3),
+    "wide": dict(n_cols=12),
+    "multiline": dict(n_cols=3, multiline_density=0.2),
+    "quoted": dict(n_cols=3, quote_density=0.2),
+}
+
+
+### Tests begin here
+
+
+@mark.skipif(not run_benchmarks, reason="set CSV_BENCH=1 to run the benchmarks")
+@mark.parametrize("validator_name", list(validators))
+@mark.parametrize("shape_name", list(csv_shapes))
+@mark.parametrize("blocksize", [2**12, 2**16])
+def test_validation_throughput(benchmark, validator_name, shape_name, blocksize):
+    """
+    Benchmark validating every block of a generated CSV, recording the throughput (in
+    MB/s) and the peak memory traced while validating (in MB) in the benchmark's extra
+    info. Only run if the ``CSV_BENCH`` environment variable is set to ``1``, so the
+    rest of the suite is not slowed down by them. Set ``CSV_BENCH_ROWS`` to change the
+    CSV size.
+    """
+    validator = validators[validator_name]
+    shape = csv_shapes[shape_name]
+    n_cols = shape["n_cols"]
+    buf = generate_csv(n_bench_rows, **shape)
+    blocks = split_blocks(buf, n_cols, blocksize)
+
+    def validate_blocks():
+        for start, end in blocks:
+            validator(buf, start, end, n_cols)
+
+    tracemalloc.start()
+    validate_blocks()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    benchmark.pedantic(validate_blocks, rounds=3, iterations=1)
+    if benchmark.stats is not None:  # None if run with ``--benchmark-disable``
+        benchmark.extra_info["MB/s"] = len(buf) / benchmark.stats.stats.mean / 1e6
+    benchmark.extra_info["peak_MB"] = peak_bytes / 1e6
+
+
+@mark.parametrize("shape_name", list(csv_shapes))
+def test_generate_csv_seeded(shape_name):
+    """
+    Show that the generator is deterministic for a given seed, and gives valid rows.
+    """
+    shape = csv_shapes[shape_name]
+    buf = generate_csv(100, **shape)
+    assert buf == generate_csv(100, **shape)
+    assert buf != generate_csv(100, **shape, seed=1)
+    assert validate_bytes(buf, shape["n_cols"]).valid
@@ -0,0 +1,74 @@
+from __future__ import annotations
+import pickle
+from pytest import mark
+
+__all__ = ["ValidationResult", "error_kinds"]
+
+error_kinds = ("absent_field", "excess_field", "quotechar", "open_quote", "parser_error", "dtype")
+
+
+class ValidationResult:
+    """
+    The verdict of validating a block, given in place of its validated rows.
+
+    Attributes:
+      n_rows     : The number of rows validated (i.e. those before any invalid row)
+      n_bytes    : The number of bytes validated (i.e. those before any invalid row, or
+                   before an unterminated last row which was not checked), or ``None``
+                   if validated from an already parsed DataFrame
+      error_pos  : The position of the first invalid row (a row position in a DataFrame
+                   or a byte offset in a buffer), or ``None`` if the block is valid (or
+                   if the position is unknown, as for a ``"parser_error"``)
+      error_kind : Why the first invalid row is invalid (one of :data:`error_kinds`), or
+                   ``None`` if the block is valid
+    """
+
+    __slots__ = ("n_rows", "n_bytes", "error_pos", "error_kind")
+
+    def __init__(
+        self,
+        n_rows: int,
+        n_bytes: int | None = None,
+        error_pos: int | None = None,
+        error_kind: str | None = None,
+    ):
+        self.n_rows = n_rows
+        self.n_bytes = n_bytes
+        self.error_pos = error_pos
+        self.error_kind = error_kind
+
+    @property
+    def valid(self) -> bool:
+        return self.error_kind is None
+
+    def _astuple(self) -> tuple:
+        return (self.n_rows, self.n_bytes, self.error_pos, self.error_kind)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ValidationResult):
+            return NotImplemented
+        return self._astuple() == other._astuple()
+
+    def __repr__(self) -> str:
+        attrs = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({attrs})"
+
+
+### Tests begin here
+
+
+@mark.parametrize(
+    "result,valid",
+    [
+        (ValidationResult(3, 20), True),
+        (ValidationResult(1, 10, error_pos=10, error_kind="absent_field"), False),
+    ],
+)
+def test_validation_result(result, valid):
+    """
+    Show that the result is valid only without an error, has no per-instance ``__dict__``,
+    and survives pickling (as when returned from a worker process).
+    """
+    assert result.valid == valid
+    assert not hasattr(result, "__dict__")
+    assert pickle.loads(pickle.dumps(result)) == result
@@ -0,0 +1,179 @@
+from __future__ import annotations
+from collections import OrderedDict
+from hashlib import blake2b
+import sqlite3
+from pytest import mark
+
+__all__ = ["VerdictCache"]
+
+
+class VerdictCache:
+    """
+    A cache of boundary verdicts (whether an offset is a row start, or the offset a
+    boundary resolves to, as an integer) keyed by a hash of the bytes they were reached
+    from, so that a verdict is reused wherever the same bytes are checked again: on a
+    rerun, at another blocksize, in a retried task, or in the unchanged head of a file
+    which has since been appended to.
+
+    The most recently used verdicts are kept in memory, and if a ``path`` is given all
+    of them are also kept on disk (in SQLite), so they outlive the process. Each store
+    is capped in entries, evicting the least recently used. A verdict found in memory
+    does not update its recency on disk (so the disk is only written for new verdicts
+    and those read from it).
+
+    Attributes:
+      max_entries      : The most verdicts kept in memory
+      max_disk_entries : The most verdicts kept on disk
+      hits             : The number of verdicts found (in memory or on disk)
+      misses           : The number of verdicts not found
+    """
+
+    __slots__ = (
+        "max_entries",
+        "max_disk_entries",
+        "hits",
+        "misses",
+        "_memory",
+        "_db",
+        "_clock",
+        "_n_disk_entries",
+    )
+
+    def __init__(self, path=None, max_entries: int = 1 << 16, max_disk_entries: int = 1 << 22):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._db = None if path is None else sqlite3.connect(path)
+        self._clock = 0  # The recency of the most recently used verdict on disk
+        self._n_disk_entries = 0
+        if self._db is not None:
+            with self._db:
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS verdicts "
+                    "(key BLOB PRIMARY KEY, verdict INTEGER NOT NULL, used INTEGER NOT NULL)"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS verdicts_used ON verdicts (used)")
+            n_entries, clock = self._db.execute(
+                "SELECT COUNT(*), COALESCE(MAX(used), 0) FROM verdicts"
+            ).fetchone()
+            self._n_disk_entries, self._clock = n_entries, clock
+
+    @staticmethod
+    def key(*parts) -> bytes:
+        "A 16 byte BLAKE2b hash of the bytes-like ``parts`` (each length-prefixed)."
+        h = blake2b(digest_size=16)
+        for part in parts:
+            h.update(len(part).to_bytes(8, "little"))
+            h.update(part)
+        return h.digest()
+
+    def get(self, key: bytes) -> int | None:
+        "The verdict cached for ``key``, or ``None`` if there is none."
+        verdict = self._memory.get(key)
+        if verdict is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return verdict
+        if self._db is not None:
+            row = self._db.execute("SELECT verdict FROM verdicts WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._clock += 1
+                with self._db:
+                    self._db.execute(
+                        "UPDATE verdicts SET used = ? WHERE key = ?", (self._clock, key)
+                    )
+                verdict = row[0]
+                self._remember(key, verdict)
+                self.hits += 1
+                return verdict
+        self.misses += 1
+        return None
+
+    def put(self, key: bytes, verdict: int) -> None:
+        "Cache the verdict for ``key``, evicting the least recently used if over a cap."
+        self._remember(key, verdict)
+        if self._db is None:
+            return
+        self._clock += 1
+        with self._db:
+            inserted = self._db.execute(
+                "INSERT OR IGNORE INTO verdicts VALUES (?, ?, ?)", (key, verdict, self._clock)
+            ).rowcount
+            self._n_disk_entries += inserted
+            n_evicted = self._n_disk_entries - self.max_disk_entries
+            if n_evicted > 0:
+                self._db.execute(
+                    "DELETE FROM verdicts WHERE key IN "
+                    "(SELECT key FROM verdicts ORDER BY used LIMIT ?)",
+                    (n_evicted,),
+                )
+                self._n_disk_entries -= n_evicted
+
+    def _remember(self, key: bytes, verdict: int) -> None:
+        self._memory[key] = verdict
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def __len__(self) -> int:
+        "The number of verdicts cached (on disk, if there is a ``path``, else in memory)."
+        return len(self._memory) if self._db is None else self._n_disk_entries
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __enter__(self) -> VerdictCache:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+### Tests begin here
+
+
+def test_memory_lru():
+    """
+    Show that the least recently used verdict (not the least recently added) is evicted
+    from memory once over the cap.
+    """
+    cache = VerdictCache(max_entries=2)
+    keys = [VerdictCache.key(part) for part in (b"a", b"b", b"c")]
+    cache.put(keys[0], True)
+    cache.put(keys[1], False)
+    assert cache.get(keys[0]) is True
+    cache.put(keys[2], True)
+    assert [cache.get(key) for key in keys] == [True, None, True]
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+@mark.parametrize("max_entries", [1, 16])
+def test_disk_persists(tmp_path, max_entries):
+    """
+    Show that verdicts (here resolved offsets) outlive the cache (and its memory) on
+    disk, where the least recently used (here the second, as the first was read again)
+    is evicted over the cap.
+    """
+    path = tmp_path / "verdicts.sqlite"
+    keys = [VerdictCache.key(bytes([i])) for i in range(4)]
+    with VerdictCache(path, max_entries, max_disk_entries=3) as cache:
+        for i, key in enumerate(keys[:3]):
+            cache.put(key, i * 10)
+        cache._memory.clear()
+        assert cache.get(keys[0]) == 0
+        cache.put(keys[3], 30)
+        assert len(cache) == 3
+    with VerdictCache(path, max_entries, max_disk_entries=3) as cache:
+        assert [cache.get(key) for key in keys] == [0, None, 20, 30]
+
+
+def test_key_parts():
+    """
+    Show that the key depends on how the bytes are split into parts, not just on them.
+    """
+    assert VerdictCache.key(b"ab", b"c") != VerdictCache.key(b"a", b"bc")
+    assert VerdictCache.key(b"ab", b"c") == VerdictCache.key(memoryview(b"ab"), b"c")